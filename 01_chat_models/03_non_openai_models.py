@@ -1,30 +1,50 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_anthropic import ChatAnthropic
-from langchain_openai import ChatOpenAI
+import importlib
+
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, SystemMessage
 
 load_dotenv()
 
+# Provider integrations are imported only when a model from them is first requested,
+# so a run that needs one provider does not pay the import time of all three.
+# Provider -> (module, chat model class, model name)
+PROVIDER_REGISTRY = {
+    "openai": ("langchain_openai", "ChatOpenAI", "gpt-4o"),
+    "anthropic": ("langchain_anthropic", "ChatAnthropic", "claude-3-opus-20240229"),
+    "google": ("langchain_google_genai", "ChatGoogleGenerativeAI", "gemini-1.5-flash"),
+}
+
+_chat_models = {}
+
+
+def get_chat_model(provider):
+    """Import the provider's integration on first use and return its (cached) chat model."""
+    if provider not in _chat_models:
+        module_name, class_name, model_name = PROVIDER_REGISTRY[provider]
+        model_class = getattr(importlib.import_module(module_name), class_name)
+        _chat_models[provider] = model_class(model=model_name)
+    return _chat_models[provider]
+
+
 messages = [
     SystemMessage(content="Solve the following math problems"),
     HumanMessage(content="What is 81 divided by 9?")
 ]
 
 # OpenAI
-model = ChatOpenAI(model="gpt-4o")
+model = get_chat_model("openai")
 
 result = model.invoke(messages)
 print("OpenAI response: {}".format(result.content))
 
 # Anthropic
-model = ChatAnthropic(model="claude-3-opus-20240229")
+model = get_chat_model("anthropic")
 
 result = model.invoke(messages)
 print("Anthropic response: {}".format(result.content))
 
 # Google
-model = ChatGoogleGenerativeAI(model="gemini-1.5-flash")
+model = get_chat_model("google")
 
 result = model.invoke(messages)
 print("Google response: {}".format(result.content))
@@ -1,28 +1,65 @@
+import time
+
 from dotenv import load_dotenv
 from langchain.schema import AIMessage, HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 
 load_dotenv()
 
+# Set to False to wait for the full reply (model.invoke) and compare latencies
+STREAM_OUTPUT = True
+
 model = ChatOpenAI(model="gpt-4o")
 
 chat_history = []
 
 system_message = SystemMessage(content="You are an all-purpose AI assistant")
 chat_history.append(system_message)
+turn_timings = []  # (time to first token, total time) per turn
+
+
+def get_reply(messages):
+    """Print the reply (token by token when streaming) and return it with its timings."""
+    start = time.perf_counter()
+    if not STREAM_OUTPUT:
+        result = model.invoke(messages)
+        total_time = time.perf_counter() - start
+        print("AI: {}".format(result.content))
+        return AIMessage(content=result.content), total_time, total_time
+
+    first_token_time = None
+    full_reply = None
+    print("AI: ", end="", flush=True)
+    for chunk in model.stream(messages):
+        if first_token_time is None and chunk.content:  # The first chunk is often an empty role-only delta
+            first_token_time = time.perf_counter() - start
+        print(chunk.content, end="", flush=True)
+        full_reply = chunk if full_reply is None else full_reply + chunk
+    print()
+    total_time = time.perf_counter() - start
+    if first_token_time is None:
+        first_token_time = total_time
+    return AIMessage(content=full_reply.content if full_reply else ""), first_token_time, total_time
+
 
 # Chat loop
 while True:
     query = input("User ('exit' to quit): ")
-    if query.lower == "exit":
+    if query.lower() == "exit":
         break
     chat_history.append(HumanMessage(content=query))
 
-    result = model.invoke(chat_history)
-    response = result.content
-    chat_history.append(AIMessage(content=response))
+    # The streamed chunks are merged back into one AIMessage for the history
+    ai_message, first_token_time, total_time = get_reply(chat_history)
+    chat_history.append(ai_message)
+    turn_timings.append((first_token_time, total_time))
 
-    print("AI: {}".format(response))
+    print("(time to first token: {:.2f}s, total: {:.2f}s)".format(first_token_time, total_time))
 
 print("---- Message History ----")
 print(chat_history)
+
+if turn_timings:
+    print("---- Latency ({}) ----".format("streaming" if STREAM_OUTPUT else "blocking"))
+    print("Average time to first token: {:.2f}s".format(sum(t[0] for t in turn_timings) / len(turn_timings)))
+    print("Average total time: {:.2f}s".format(sum(t[1] for t in turn_timings) / len(turn_timings)))
@@ -1,3 +1,5 @@
+import time
+
 from dotenv import load_dotenv
 from google.cloud import firestore
 from langchain_google_firestore import FirestoreChatMessageHistory
@@ -23,6 +25,7 @@ load_dotenv()
 PROJECT_ID = "langchain-demo-abf48"
 SESSION_ID = "user_session_new"
 COLLECTION_NAME = "chat_history"
+STREAM_OUTPUT = True  # Set to False to wait for the full reply (model.invoke)
 
 # Initialize Firestore Client
 print("Initializing Firestore Client...")
@@ -41,6 +44,31 @@ print("Current Chat History:", chat_history.messages)
 # Initialize Chat Model
 model = ChatOpenAI()
 
+
+def get_reply(messages):
+    """Print the reply (token by token when streaming) and return its text and timings."""
+    start = time.perf_counter()
+    if not STREAM_OUTPUT:
+        content = model.invoke(messages).content
+        total_time = time.perf_counter() - start
+        print("AI: {}".format(content))
+        return content, total_time, total_time
+
+    first_token_time = None
+    content = ""
+    print("AI: ", end="", flush=True)
+    for chunk in model.stream(messages):
+        if first_token_time is None and chunk.content:
+            first_token_time = time.perf_counter() - start
+        print(chunk.content, end="", flush=True)
+        content += chunk.content
+    print()
+    total_time = time.perf_counter() - start
+    if first_token_time is None:
+        first_token_time = total_time
+    return content, first_token_time, total_time
+
+
 print("Start chatting with the AI. Type 'exit' to quit.")
 
 while True:
@@ -49,8 +77,8 @@ while True:
         break
 
     chat_history.add_user_message(human_input)
-    ai_response = model.invoke(chat_history.messages)
-    chat_history.add_ai_message(ai_response.content)
+    # Only the complete reply is written to Firestore, once streaming has finished
+    ai_content, first_token_time, total_time = get_reply(chat_history.messages)
+    chat_history.add_ai_message(ai_content)
 
-    print("AI: {}".format(ai_response.content))
-    
\ No newline at end of file
+    print("(time to first token: {:.2f}s, total: {:.2f}s)".format(first_token_time, total_time))
@@ -0,0 +1,223 @@
+import asyncio
+import random
+import statistics
+import time
+from typing import Any, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+CLAUDE_3_OPUS_MODEL_STR = "claude-3-opus-20240229"
+GEMINI_1_5_FLASH_MODEL_STR = "gemini-1.5-flash"
+OPENAI_STR = "OpenAI"
+ANTHROPIC_STR = "Anthropic"
+GOOGLE_STR = "Google"
+BENCHMARK_ROUNDS = 20
+
+# Set to False to race the real providers from 03_non_openai_models.py (requires API keys).
+# The local stand-ins let the fan-out be benchmarked offline.
+USE_LOCAL_STAND_INS = True
+
+messages = [
+    SystemMessage(content="Solve the following math problems"),
+    HumanMessage(content="What is 81 divided by 9?"),
+]
+
+
+class LatencyChatModel(BaseChatModel):
+    """Local stand-in chat model that answers after a log-normally distributed delay."""
+
+    answer: str = "81 divided by 9 is 9."
+    median_latency: float = 0.5  # Seconds
+    sigma: float = 0.4  # Spread of the log-normal distribution, higher means a heavier tail
+    failure_rate: float = 0.0  # Probability that a call raises instead of answering
+
+    @property
+    def _llm_type(self) -> str:
+        return "latency-stand-in"
+
+    def _sample_latency(self) -> float:
+        return random.lognormvariate(0, self.sigma) * self.median_latency
+
+    def _respond(self) -> ChatResult:
+        if random.random() < self.failure_rate:
+            raise RuntimeError("Stand-in provider failed")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._sample_latency())
+        return self._respond()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._sample_latency())
+        return self._respond()
+
+
+def build_real_providers():
+    """Create the same three provider models used in 03_non_openai_models.py."""
+    from langchain_anthropic import ChatAnthropic
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_openai import ChatOpenAI
+
+    return {
+        OPENAI_STR: ChatOpenAI(model=GPT_4O_MODEL_STR),
+        ANTHROPIC_STR: ChatAnthropic(model=CLAUDE_3_OPUS_MODEL_STR),
+        GOOGLE_STR: ChatGoogleGenerativeAI(model=GEMINI_1_5_FLASH_MODEL_STR),
+    }
+
+
+def build_stand_in_providers():
+    """Create local stand-ins with a different latency profile per provider."""
+    return {
+        OPENAI_STR: LatencyChatModel(median_latency=0.6, sigma=0.3),
+        ANTHROPIC_STR: LatencyChatModel(median_latency=0.9, sigma=0.5),
+        GOOGLE_STR: LatencyChatModel(median_latency=0.4, sigma=0.8, failure_rate=0.1),
+    }
+
+
+def is_valid_response(result):
+    """A response is usable when the model returned non-empty text content."""
+    return isinstance(result.content, str) and result.content.strip() != ""
+
+
+async def timed_call(model, messages):
+    """Invoke a model asynchronously and return (result, error, latency in seconds)."""
+    start = time.perf_counter()
+    try:
+        result = await model.ainvoke(messages)
+        return result, None, time.perf_counter() - start
+    except Exception as e:
+        return None, e, time.perf_counter() - start
+
+
+async def race_providers(providers, messages):
+    """Send the messages to every provider at once and return the first valid answer.
+
+    Returns (winner name, winner result, per-provider report). The slower calls are
+    cancelled as soon as a valid answer arrives and are reported as "cancelled".
+    """
+    tasks = {asyncio.create_task(timed_call(model, messages)): name for name, model in providers.items()}
+    pending = set(tasks)
+    report = {}
+    winner_name, winner_result = None, None
+    try:
+        while pending and winner_name is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = tasks[task]
+                result, error, latency = task.result()
+                if error is not None or not is_valid_response(result):
+                    report[name] = {"status": "error", "latency": latency, "error": error}
+                elif winner_name is None:
+                    winner_name, winner_result = name, result
+                    report[name] = {"status": "won", "latency": latency}
+                else:
+                    # Finished in the same event loop tick as the winner
+                    report[name] = {"status": "ok", "latency": latency}
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in pending:
+            report[tasks[task]] = {"status": "cancelled", "latency": None}
+
+    if winner_name is None:
+        raise RuntimeError("No provider returned a valid response: {}".format(report))
+    return winner_name, winner_result, report
+
+
+async def gather_providers(providers, messages):
+    """Send the messages to every provider at once and wait for all of them."""
+    names = list(providers)
+    outcomes = await asyncio.gather(*(timed_call(providers[name], messages) for name in names))
+    report = {}
+    for name, (result, error, latency) in zip(names, outcomes):
+        if error is not None or not is_valid_response(result):
+            report[name] = {"status": "error", "latency": latency, "error": error}
+        else:
+            report[name] = {"status": "ok", "latency": latency, "result": result}
+    return report
+
+
+def call_sequentially(providers, messages):
+    """Baseline: the one-after-another approach from 03_non_openai_models.py."""
+    report = {}
+    for name, model in providers.items():
+        start = time.perf_counter()
+        try:
+            result = model.invoke(messages)
+            report[name] = {"status": "ok", "latency": time.perf_counter() - start, "result": result}
+        except Exception as e:
+            report[name] = {"status": "error", "latency": time.perf_counter() - start, "error": e}
+    return report
+
+
+def print_report(report):
+    for name, entry in report.items():
+        latency = "-" if entry["latency"] is None else "{:.3f}s".format(entry["latency"])
+        print("  {:<10} {:<10} {}".format(name, entry["status"], latency))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(label, wall_times):
+    print("{:<12} mean {:.3f}s | p50 {:.3f}s | p95 {:.3f}s".format(
+        label, statistics.mean(wall_times), percentile(wall_times, 50), percentile(wall_times, 95)))
+
+
+def run_benchmark(providers, rounds):
+    """Compare wall time of sequential calls, racing and gathering over several rounds."""
+    sequential_times, race_times, gather_times = [], [], []
+    wins = {name: 0 for name in providers}
+    for _ in range(rounds):
+        start = time.perf_counter()
+        call_sequentially(providers, messages)
+        sequential_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        winner_name, _, _ = asyncio.run(race_providers(providers, messages))
+        race_times.append(time.perf_counter() - start)
+        wins[winner_name] += 1
+
+        start = time.perf_counter()
+        asyncio.run(gather_providers(providers, messages))
+        gather_times.append(time.perf_counter() - start)
+
+    print("\n--- Benchmark ({} rounds) ---".format(rounds))
+    summarize("Sequential", sequential_times)
+    summarize("Race", race_times)
+    summarize("Gather", gather_times)
+    print("Race wins per provider: {}".format(wins))
+
+
+providers = build_stand_in_providers() if USE_LOCAL_STAND_INS else build_real_providers()
+
+# 1. Race: first valid answer wins, the remaining calls are cancelled
+print("\n--- Racing {} providers ---".format(len(providers)))
+winner_name, winner_result, race_report = asyncio.run(race_providers(providers, messages))
+print("Winner: {} -> {}".format(winner_name, winner_result.content))
+print_report(race_report)
+
+# 2. Gather: wait for every provider, total wall time is the slowest call instead of the sum
+print("\n--- Gathering all {} providers ---".format(len(providers)))
+gather_report = asyncio.run(gather_providers(providers, messages))
+print_report(gather_report)
+for name, entry in gather_report.items():
+    if entry["status"] == "ok":
+        print("{} response: {}".format(name, entry["result"].content))
+
+# 3. Offline benchmark against the local stand-ins only, to avoid spending API credits
+if USE_LOCAL_STAND_INS:
+    run_benchmark(providers, BENCHMARK_ROUNDS)
@@ -0,0 +1,177 @@
+import time
+
+import tiktoken
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+FALLBACK_ENCODING_STR = "cl100k_base"
+WINDOW_TOKEN_BUDGET = 1000  # Tokens kept verbatim for the most recent turns
+SUMMARY_TOKEN_BUDGET = 250  # Upper bound the summary is asked to stay under
+SPILL_TARGET_RATIO = 0.5  # A spill trims the window to this share of its budget, so summaries stay rare
+TOKENS_PER_MESSAGE = 3  # Per-message overhead of the chat format
+TOKENS_PER_REPLY = 3  # Every reply is primed with <|start|>assistant<|message|>
+
+# Set to True to replay a long scripted session against a local fake model,
+# which shows the per-turn prompt size staying flat without spending API credits.
+SIMULATE_SESSION = False
+SIMULATED_TURNS = 40
+
+SUMMARY_PROMPT_STR = (
+    "Progressively summarize the conversation below, adding to the previous summary. "
+    "Keep names, numbers and decisions. Stay under {} tokens.\n\n"
+    "Previous summary:\n{}\n\nNew lines of conversation:\n{}\n\nNew summary:"
+)
+
+
+def get_encoding(model_name):
+    """Return the tiktoken encoding for a model, falling back to cl100k_base."""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING_STR)
+
+
+class TokenBudgetChatHistory:
+    """Chat history that keeps recent turns verbatim and older turns as a rolling summary.
+
+    Every message is tokenized once, when it is added. When the recent window grows past
+    `window_token_budget`, the oldest turns are moved out of the window (down to
+    `SPILL_TARGET_RATIO` of the budget) and folded into the summary with a single
+    summarization call; the summary is not touched otherwise.
+    """
+
+    def __init__(self, system_message, summary_model, model_name=GPT_4O_MODEL_STR,
+                 window_token_budget=WINDOW_TOKEN_BUDGET, summary_token_budget=SUMMARY_TOKEN_BUDGET):
+        self.encoding = get_encoding(model_name)
+        self.summary_model = summary_model
+        self.window_token_budget = window_token_budget
+        self.summary_token_budget = summary_token_budget
+        self.system_message = system_message
+        self.system_tokens = self.count_tokens(system_message)
+        self.summary = ""
+        self.summary_tokens = 0
+        self.window = []  # List of (message, token count) pairs
+        self.window_tokens = 0
+        self.summary_updates = 0
+        self.turn_stats = []
+
+    def count_tokens(self, message):
+        return TOKENS_PER_MESSAGE + len(self.encoding.encode(message.content))
+
+    def add_message(self, message):
+        tokens = self.count_tokens(message)
+        self.window.append((message, tokens))
+        self.window_tokens += tokens
+
+    def add_user_message(self, content):
+        self.add_message(HumanMessage(content=content))
+
+    def add_ai_message(self, content):
+        self.add_message(AIMessage(content=content))
+        self._spill_if_needed()
+
+    def _spill_if_needed(self):
+        """Fold the oldest turns into the summary once the window is over budget."""
+        if self.window_tokens <= self.window_token_budget:
+            return
+        spilled = []
+        target_tokens = int(self.window_token_budget * SPILL_TARGET_RATIO)
+        # Always keep at least the latest human/AI pair verbatim
+        while self.window_tokens > target_tokens and len(self.window) > 2:
+            message, tokens = self.window.pop(0)
+            self.window_tokens -= tokens
+            spilled.append(message)
+        if spilled:
+            self._update_summary(spilled)
+
+    def _update_summary(self, spilled):
+        lines = "\n".join("{}: {}".format(message.type, message.content) for message in spilled)
+        prompt = SUMMARY_PROMPT_STR.format(self.summary_token_budget, self.summary or "(none)", lines)
+        self.summary = self.summary_model.invoke([HumanMessage(content=prompt)]).content
+        self.summary_tokens = self.count_tokens(SystemMessage(content=self.summary))
+        self.summary_updates += 1
+
+    @property
+    def messages(self):
+        messages = [self.system_message]
+        if self.summary:
+            messages.append(SystemMessage(content="Summary of the earlier conversation: {}".format(self.summary)))
+        messages.extend(message for message, _ in self.window)
+        return messages
+
+    @property
+    def prompt_tokens(self):
+        """Estimated prompt tokens of the next model call."""
+        summary_tokens = self.summary_tokens if self.summary else 0
+        return self.system_tokens + summary_tokens + self.window_tokens + TOKENS_PER_REPLY
+
+    def record_turn(self, prompt_tokens, completion_tokens, latency):
+        self.turn_stats.append({
+            "turn": len(self.turn_stats) + 1,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "window_tokens": self.window_tokens,
+            "summary_tokens": self.summary_tokens,
+            "latency": latency,
+        })
+
+
+def chat_turn(model, history, query):
+    """Run one turn of the conversation and record its token counts and latency."""
+    history.add_user_message(query)
+    prompt_tokens = history.prompt_tokens
+
+    start = time.perf_counter()
+    result = model.invoke(history.messages)
+    latency = time.perf_counter() - start
+
+    completion_tokens = len(history.encoding.encode(result.content))
+    history.add_ai_message(result.content)
+    history.record_turn(prompt_tokens, completion_tokens, latency)
+    return result.content
+
+
+def print_turn_stats(history):
+    print("---- Per-turn Token Counts ----")
+    print("{:>5} {:>14} {:>18} {:>14} {:>15} {:>10}".format(
+        "Turn", "Prompt tokens", "Completion tokens", "Window tokens", "Summary tokens", "Latency"))
+    for stats in history.turn_stats:
+        print("{turn:>5} {prompt_tokens:>14} {completion_tokens:>18} {window_tokens:>14} "
+              "{summary_tokens:>15} {latency:>9.3f}s".format(**stats))
+    print("Summary recomputed {} times over {} turns".format(history.summary_updates, len(history.turn_stats)))
+
+
+system_message = SystemMessage(content="You are an all-purpose AI assistant")
+
+if SIMULATE_SESSION:
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    answer = "Here is a detailed answer that covers the question from several angles. " * 6
+    model = FakeListChatModel(responses=[answer])
+    summary_model = FakeListChatModel(responses=["The user asked a series of numbered questions. " * 8])
+    history = TokenBudgetChatHistory(system_message, summary_model)
+
+    for i in range(1, SIMULATED_TURNS + 1):
+        chat_turn(model, history, "Question number {}: tell me something new about topic {}.".format(i, i))
+else:
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI(model=GPT_4O_MODEL_STR)
+    history = TokenBudgetChatHistory(system_message, summary_model=model)
+
+    # Chat loop
+    while True:
+        query = input("User ('exit' to quit): ")
+        if query.lower() == "exit":
+            break
+        response = chat_turn(model, history, query)
+        stats = history.turn_stats[-1]
+        print("AI: {}".format(response))
+        print("(prompt tokens: {}, completion tokens: {}, latency: {:.2f}s)".format(
+            stats["prompt_tokens"], stats["completion_tokens"], stats["latency"]))
+
+print_turn_stats(history)
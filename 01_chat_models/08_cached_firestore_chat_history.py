@@ -0,0 +1,379 @@
+"""
+Write-behind, locally cached chat history for Firestore.
+
+05_save_chat_history_to_firebase.py writes to Firestore on every add_user_message/add_ai_message
+and reads chat_history.messages before each model call. This history instead:
+    - keeps the session in process memory, so reading .messages never touches the network
+    - queues new messages and writes them in batches from a background thread (flushed on exit)
+    - stores one document per message, so a long session only loads its latest page on startup
+      and older pages are fetched on demand with load_older_messages()
+
+Run against the Firestore emulator by setting FIRESTORE_EMULATOR_HOST (e.g. localhost:8080)
+before creating the client, or set USE_IN_MEMORY_FAKE = True to run without any Firestore.
+"""
+import atexit
+import queue
+import threading
+import time
+
+from dotenv import load_dotenv
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import message_to_dict, messages_from_dict
+
+load_dotenv()
+
+# Firebase Firestore Setup
+PROJECT_ID = "langchain-demo-abf48"
+SESSION_ID = "user_session_new"
+COLLECTION_NAME = "chat_history"
+MESSAGES_SUBCOLLECTION_NAME = "messages"
+SEQ_FIELD_STR = "seq"
+DESCENDING_STR = "DESCENDING"  # Same value as firestore.Query.DESCENDING
+
+PAGE_SIZE = 50  # Messages loaded at startup and per load_older_messages() call
+WRITE_BATCH_SIZE = 20  # Pending messages that trigger a batch write (Firestore allows up to 500)
+FLUSH_INTERVAL = 2.0  # Seconds a message may wait in the queue before it is written
+
+# Set to True to run against an in-memory fake with simulated round-trip latency
+USE_IN_MEMORY_FAKE = False
+FAKE_ROUND_TRIP_LATENCY = 0.05
+
+
+class CachedFirestoreChatMessageHistory(BaseChatMessageHistory):
+    """Firestore chat history with an in-process cache, write-behind batching and paged loading.
+
+    Messages live in `{collection}/{session_id}/messages/{seq}` so they can be paged by sequence
+    number instead of rewriting and re-reading a single growing document.
+    """
+
+    def __init__(self, session_id, collection, client, page_size=PAGE_SIZE,
+                 write_batch_size=WRITE_BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.client = client
+        self.session_id = session_id
+        self.messages_ref = (
+            client.collection(collection).document(session_id).collection(MESSAGES_SUBCOLLECTION_NAME)
+        )
+        self.page_size = page_size
+        self.write_batch_size = write_batch_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._messages = []
+        self._oldest_loaded_seq = None
+        self._next_seq = 0
+        self._pending = queue.Queue()
+        self._stop_event = threading.Event()
+        self._write_error = None  # Error of the last failed batch write, raised by flush()
+        self._failed_items = []  # Messages of failed batch writes, queued again by flush()
+        self.writes = 0  # Committed batch writes, i.e. network round-trips spent on saving
+
+        self._load_latest_page()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # --- Reading ---------------------------------------------------------
+
+    def _fetch_page(self, before_seq=None, limit=None):
+        query = self.messages_ref
+        if before_seq is not None:
+            query = query.where(SEQ_FIELD_STR, "<", before_seq)
+        query = query.order_by(SEQ_FIELD_STR, direction=DESCENDING_STR).limit(limit or self.page_size)
+        docs = [snapshot.to_dict() for snapshot in query.stream()]
+        docs.reverse()  # Oldest first
+        return docs
+
+    def _load_latest_page(self):
+        docs = self._fetch_page()
+        self._messages = messages_from_dict([doc["message"] for doc in docs])
+        if docs:
+            self._oldest_loaded_seq = docs[0][SEQ_FIELD_STR]
+            self._next_seq = docs[-1][SEQ_FIELD_STR] + 1
+
+    @property
+    def has_older_messages(self):
+        return self._oldest_loaded_seq is not None and self._oldest_loaded_seq > 0
+
+    def load_older_messages(self, limit=None):
+        """Fetch the page of messages before the oldest cached one and prepend it to the cache."""
+        if not self.has_older_messages:
+            return []
+        docs = self._fetch_page(before_seq=self._oldest_loaded_seq, limit=limit)
+        older = messages_from_dict([doc["message"] for doc in docs])
+        with self._lock:
+            self._messages = older + self._messages
+            if docs:
+                self._oldest_loaded_seq = docs[0][SEQ_FIELD_STR]
+            else:
+                self._oldest_loaded_seq = None
+        return older
+
+    @property
+    def messages(self):
+        """Cached messages of the session; served from memory, never from Firestore."""
+        with self._lock:
+            return list(self._messages)
+
+    # --- Writing ---------------------------------------------------------
+
+    def add_message(self, message):
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._messages.append(message)
+            if self._oldest_loaded_seq is None:
+                self._oldest_loaded_seq = seq
+        self._pending.put((seq, message))
+
+    def _write_loop(self):
+        while not self._stop_event.is_set():
+            self._write_pending(wait=True)
+        # Drain whatever is still queued on shutdown
+        while not self._pending.empty():
+            self._write_pending(wait=False)
+
+    def _write_pending(self, wait):
+        """Collect up to one batch of queued messages and commit them in a single write."""
+        batch_items = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch_items) < self.write_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if wait and timeout > 0 and not self._stop_event.is_set():
+                    batch_items.append(self._pending.get(timeout=timeout))
+                else:
+                    batch_items.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+        if not batch_items:
+            return
+
+        try:
+            batch = self.client.batch()
+            for seq, message in batch_items:
+                doc_ref = self.messages_ref.document("{:010d}".format(seq))
+                batch.set(doc_ref, {SEQ_FIELD_STR: seq, "message": message_to_dict(message)})
+            batch.commit()
+            self.writes += 1
+        except Exception as e:
+            # Keep the writer alive; flush() reports the error and retries these messages
+            with self._lock:
+                self._write_error = e
+                self._failed_items.extend(batch_items)
+        finally:
+            for _ in batch_items:
+                self._pending.task_done()
+
+    def flush(self):
+        """Block until every queued message has been written to Firestore.
+
+        Raises the error of a failed batch write, after queueing its messages again so that the
+        next flush() retries them.
+        """
+        if not self._writer.is_alive():  # Closed: nothing else drains the queue
+            while not self._pending.empty():
+                self._write_pending(wait=False)
+        self._pending.join()
+        with self._lock:
+            error, self._write_error = self._write_error, None
+            failed_items, self._failed_items = self._failed_items, []
+        for item in failed_items:
+            self._pending.put(item)
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Stop the background writer after writing everything still queued.
+
+        Messages of failed batch writes are retried once more; if that fails too, the write
+        error is raised rather than losing them silently.
+        """
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        self._writer.join()
+        if self._failed_items:
+            try:
+                self.flush()  # Raises the earlier write error after queueing its messages again
+            except Exception:
+                pass
+            self.flush()  # Writes them in this thread; raises if they still cannot be written
+
+    def clear(self):
+        self.flush()
+        for snapshot in self.messages_ref.stream():
+            snapshot.reference.delete()
+        with self._lock:
+            self._messages = []
+            self._oldest_loaded_seq = None
+            self._next_seq = 0
+
+
+def migrate_from_firestore_chat_history(legacy_history, history):
+    """Copy the messages of a FirestoreChatMessageHistory session into the cached layout."""
+    history.add_messages(legacy_history.messages)
+    history.flush()
+
+
+# --- In-memory fake of the Firestore client, for tests and offline runs ---
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeDocumentReference:
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+
+    def collection(self, name):
+        return FakeQuery(self.client, "{}/{}".format(self.path, name))
+
+    def document(self, name):
+        return FakeDocumentReference(self.client, "{}/{}".format(self.path, name))
+
+    def set(self, data):
+        self.client.round_trip()
+        self.client.documents[self.path] = dict(data)
+
+    def delete(self):
+        self.client.round_trip()
+        self.client.documents.pop(self.path, None)
+
+
+class FakeQuery:
+    def __init__(self, client, collection_path, filters=(), order=None, limit_count=None):
+        self.client = client
+        self.collection_path = collection_path
+        self.filters = filters
+        self.order = order
+        self.limit_count = limit_count
+
+    def document(self, name):
+        return FakeDocumentReference(self.client, "{}/{}".format(self.collection_path, name))
+
+    def where(self, field, op, value):
+        assert op == "<", "The fake only supports the '<' filter used above"
+        return FakeQuery(self.client, self.collection_path, self.filters + ((field, value),),
+                         self.order, self.limit_count)
+
+    def order_by(self, field, direction=None):
+        return FakeQuery(self.client, self.collection_path, self.filters,
+                         (field, direction == DESCENDING_STR), self.limit_count)
+
+    def limit(self, count):
+        return FakeQuery(self.client, self.collection_path, self.filters, self.order, count)
+
+    def stream(self):
+        self.client.round_trip()
+        prefix = self.collection_path + "/"
+        rows = [
+            (path, data) for path, data in self.client.documents.items()
+            if path.startswith(prefix) and "/" not in path[len(prefix):]
+            and all(data[field] < value for field, value in self.filters)
+        ]
+        if self.order is not None:
+            field, descending = self.order
+            rows.sort(key=lambda row: row[1][field], reverse=descending)
+        if self.limit_count is not None:
+            rows = rows[:self.limit_count]
+        return [FakeSnapshot(FakeDocumentReference(self.client, path), data) for path, data in rows]
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, reference, data):
+        self.writes.append((reference.path, dict(data)))
+
+    def commit(self):
+        self.client.round_trip()
+        for path, data in self.writes:
+            self.client.documents[path] = data
+
+
+class InMemoryFirestoreClient:
+    """Minimal stand-in for firestore.Client covering the calls made by the history above."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.documents = {}
+        self.round_trips = 0
+
+    def round_trip(self):
+        self.round_trips += 1
+        time.sleep(self.latency)
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+
+if USE_IN_MEMORY_FAKE:
+    print("Initializing in-memory Firestore fake...")
+    client = InMemoryFirestoreClient(latency=FAKE_ROUND_TRIP_LATENCY)
+else:
+    from google.cloud import firestore
+
+    print("Initializing Firestore Client...")
+    client = firestore.Client(project=PROJECT_ID)
+
+print("Initializing cached Firestore Chat Message History...")
+chat_history = CachedFirestoreChatMessageHistory(
+    session_id=SESSION_ID,
+    collection=COLLECTION_NAME,
+    client=client,
+)
+print("Chat history Initialized with the latest {} messages.".format(len(chat_history.messages)))
+
+if USE_IN_MEMORY_FAKE:
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    # Scripted session: the history adds no round-trips to the turns themselves
+    model = FakeListChatModel(responses=["Sure, here is my answer."])
+    turn_times = []
+    for i in range(60):
+        start = time.perf_counter()
+        chat_history.add_user_message("Question {}".format(i))
+        ai_response = model.invoke(chat_history.messages)
+        chat_history.add_ai_message(ai_response.content)
+        turn_times.append(time.perf_counter() - start)
+    chat_history.flush()
+    print("Average history overhead per turn: {:.4f}s".format(sum(turn_times) / len(turn_times)))
+    print("Batch writes for {} messages: {}".format(len(chat_history.messages), chat_history.writes))
+
+    # A new process only loads the latest page and pages back on demand
+    reloaded = CachedFirestoreChatMessageHistory(session_id=SESSION_ID, collection=COLLECTION_NAME, client=client)
+    print("Reloaded {} of 120 messages".format(len(reloaded.messages)))
+    while reloaded.has_older_messages:
+        reloaded.load_older_messages()
+    print("After paging back: {} messages, first: {}".format(len(reloaded.messages), reloaded.messages[0].content))
+    print("Total Firestore round-trips: {}".format(client.round_trips))
+else:
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI()
+
+    print("Start chatting with the AI. Type 'exit' to quit.")
+
+    while True:
+        human_input = input("User: ")
+        if human_input.lower() == "exit":
+            break
+
+        chat_history.add_user_message(human_input)
+        ai_response = model.invoke(chat_history.messages)
+        chat_history.add_ai_message(ai_response.content)
+
+        print("AI: {}".format(ai_response.content))
+
+chat_history.close()
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import warnings
+
+from dotenv import load_dotenv
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import HumanMessage, SystemMessage
+
+load_dotenv()
+
+# langchain_core.load.loads is marked beta; it is the serializer LangChain's own caches use
+warnings.filterwarnings("ignore", category=LangChainBetaWarning)
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+CACHE_DIR_STR = "cache"
+CACHE_DB_STR = "llm_response_cache.sqlite3"
+MAX_CACHE_ENTRIES = 10000  # Least recently used entries are evicted beyond this size
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60  # Entries older than this are treated as misses
+
+# Set to True to run against a local fake chat model instead of the OpenAI API
+USE_LOCAL_STAND_IN = False
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+cache_path = os.path.join(current_dir, CACHE_DIR_STR, CACHE_DB_STR)
+
+
+class SQLiteLRUCache(BaseCache):
+    """Persistent exact-match response cache with size-bounded LRU and TTL eviction.
+
+    LangChain hands every chat model call to the cache as (prompt, llm_string): the serialized
+    messages and a canonical string of the model name and call parameters. The key is a SHA-256
+    hash of both, so identical calls hit regardless of which script or chat model makes them.
+    """
+
+    def __init__(self, database_path, max_entries=MAX_CACHE_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS):
+        os.makedirs(os.path.dirname(database_path), exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(database_path, check_same_thread=False)
+        # WAL without a sync on every commit keeps the last_access updates on hits cheap
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(prompt, llm_string):
+        return hashlib.sha256("{}\x00{}".format(llm_string, prompt).encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits += 1
+        return loads(value)
+
+    def update(self, prompt, llm_string, return_val):
+        key = self.make_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, dumps(return_val), now, now),
+            )
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        """Drop expired entries, then the least recently used ones above max_entries."""
+        if self.ttl_seconds is not None:
+            cursor = self._connection.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self.evictions += cursor.rowcount
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_entries:
+            cursor = self._connection.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
+            self.evictions += cursor.rowcount
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def stats(self):
+        with self._lock:
+            (size,) = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "size": size,
+        }
+
+
+# Plug the cache into every chat model in the process.
+# A single model can opt in instead with e.g. ChatOpenAI(model=..., cache=llm_cache).
+llm_cache = SQLiteLRUCache(cache_path)
+set_llm_cache(llm_cache)
+
+if USE_LOCAL_STAND_IN:
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    class SlowFakeChatModel(FakeListChatModel):
+        """Fake chat model that takes `sleep` seconds per call, like an API round-trip."""
+
+        def _call(self, *args, **kwargs):
+            time.sleep(self.sleep or 0)
+            return super()._call(*args, **kwargs)
+
+    model = SlowFakeChatModel(responses=["81 divided by 9 is 9."], sleep=0.5)
+else:
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI(model=GPT_4O_MODEL_STR)
+
+messages = [
+    SystemMessage(content="Solve the following math problems"),
+    HumanMessage(content="What is 81 divided by 9?"),
+]
+
+# The first call may go to the API; repeated identical calls are served from SQLite
+for attempt in range(1, 4):
+    start = time.perf_counter()
+    result = model.invoke(messages)
+    elapsed = time.perf_counter() - start
+    print("Call {}: {:.6f}s -> {}".format(attempt, elapsed, result.content))
+
+print("\n--- Cache statistics ---")
+print(llm_cache.stats())
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+TEXT_EMBEDDING_3_SMALL = "text-embedding-3-small"
+OPENAI_API_BASE_STR = "https://api.openai.com/v1"
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY_SECONDS = 60.0
+BENCHMARK_CALLS = 30
+
+# Set to False to point the factory at the real OpenAI API (requires OPENAI_API_KEY).
+# The local stand-in speaks the OpenAI chat/embeddings wire format so latency can be measured offline.
+USE_LOCAL_STAND_IN = True
+STAND_IN_LATENCY_SECONDS = 0.02
+STAND_IN_API_KEY_STR = "sk-local-stand-in"
+
+
+class ConnectionMetrics:
+    """Counts requests and newly opened TCP connections seen by an httpx client."""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self._lock = threading.Lock()
+
+    def trace(self, event_name, info):
+        # httpcore reports this event only when the pool has to open a fresh connection
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
+
+    def on_request(self, request):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self.trace
+
+    async def on_async_request(self, request):
+        self.on_request(request)
+
+    def snapshot(self):
+        with self._lock:
+            reused = self.requests - self.new_connections
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": reused,
+                "reuse_rate": reused / self.requests if self.requests else 0.0,
+            }
+
+
+class ModelFactory:
+    """Hands out singleton chat and embedding models that share one keep-alive connection pool.
+
+    Building ChatOpenAI/OpenAIEmbeddings per call (or per function, as the RAG scripts did)
+    gives every instance its own HTTP client, so TCP/TLS sessions are never reused.
+    """
+
+    def __init__(self, base_url=None, api_key=None, max_connections=MAX_CONNECTIONS,
+                 max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS, keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.metrics = ConnectionMetrics()
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_keepalive_connections,
+                              keepalive_expiry=keepalive_expiry)
+        self.http_client = httpx.Client(limits=limits, event_hooks={"request": [self.metrics.on_request]})
+        self.http_async_client = httpx.AsyncClient(
+            limits=limits, event_hooks={"request": [self.metrics.on_async_request]})
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, key, create):
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = create()
+            return self._models[key]
+
+    def _client_kwargs(self):
+        kwargs = {"http_client": self.http_client, "http_async_client": self.http_async_client}
+        if self.base_url:
+            kwargs["openai_api_base"] = self.base_url
+        if self.api_key:
+            kwargs["openai_api_key"] = self.api_key
+        return kwargs
+
+    @staticmethod
+    def _cache_key(kind, model, kwargs):
+        # Serialised, as kwargs may hold unhashable values such as a model_kwargs dict
+        return kind, model, json.dumps(kwargs, sort_keys=True, default=repr)
+
+    def chat_model(self, model=GPT_4O_MODEL_STR, **kwargs):
+        key = self._cache_key("chat", model, kwargs)
+        return self._get_or_create(key, lambda: ChatOpenAI(model=model, **self._client_kwargs(), **kwargs))
+
+    def embeddings(self, model=TEXT_EMBEDDING_3_SMALL, **kwargs):
+        key = self._cache_key("embeddings", model, kwargs)
+        return self._get_or_create(key, lambda: OpenAIEmbeddings(model=model, **self._client_kwargs(), **kwargs))
+
+    def warm_up(self, connections=1):
+        """Open `connections` pooled connections ahead of the first real request."""
+        url = "{}/models".format((self.base_url or OPENAI_API_BASE_STR).rstrip("/"))
+        headers = {"Authorization": "Bearer {}".format(self.api_key)} if self.api_key else {}
+        threads = [threading.Thread(target=self.http_client.get, args=(url,), kwargs={"headers": headers})
+                   for _ in range(connections)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def connection_metrics(self):
+        return self.metrics.snapshot()
+
+    def close(self):
+        """Close both pooled clients; from inside a running event loop, await aclose() instead."""
+        asyncio.run(self.aclose())
+
+    async def aclose(self):
+        self.http_client.close()
+        await self.http_async_client.aclose()
+
+
+# --- Local OpenAI-compatible stand-in server ---
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        StandInHandler.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send_json({"object": "list", "data": [{"id": GPT_4O_MODEL_STR, "object": "model"}]})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(STAND_IN_LATENCY_SECONDS)
+        if self.path.endswith("/embeddings"):
+            inputs = request["input"] if isinstance(request["input"], list) else [request["input"]]
+            self._send_json({
+                "object": "list",
+                "model": request["model"],
+                "data": [{"object": "embedding", "index": i, "embedding": [0.1] * 8} for i in range(len(inputs))],
+                "usage": {"prompt_tokens": 1, "total_tokens": 1},
+            })
+        else:
+            self._send_json({
+                "id": "chatcmpl-local",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "81 divided by 9 is 9."}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            })
+
+
+def start_stand_in_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:{}/v1".format(server.server_address[1])
+
+
+def time_calls(get_model, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        get_model().invoke("What is 81 divided by 9?")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+if USE_LOCAL_STAND_IN:
+    server, base_url = start_stand_in_server()
+    api_key = STAND_IN_API_KEY_STR
+else:
+    server, base_url, api_key = None, None, None
+
+factory = ModelFactory(base_url=base_url, api_key=api_key)
+
+print("\n--- Warming up the shared connection pool ---")
+start = time.perf_counter()
+factory.warm_up(connections=2)
+print("Warm-up took {:.3f}s: {}".format(time.perf_counter() - start, factory.connection_metrics()))
+
+# Same arguments, same instance: every script asking for gpt-4o gets the one pooled model
+assert factory.chat_model() is factory.chat_model()
+assert factory.chat_model(model_kwargs={"top_p": 0.9}) is factory.chat_model(model_kwargs={"top_p": 0.9})
+embeddings = factory.embeddings(check_embedding_ctx_length=not USE_LOCAL_STAND_IN)
+print("Embedding dimensions: {}".format(len(embeddings.embed_query("Who is Odysseus' wife?"))))
+
+print("\n--- Per-call latency ({} calls each) ---".format(BENCHMARK_CALLS))
+connections_before = StandInHandler.connections
+fresh_latencies = time_calls(
+    lambda: ChatOpenAI(model=GPT_4O_MODEL_STR, openai_api_base=base_url, openai_api_key=api_key), BENCHMARK_CALLS)
+fresh_connections = StandInHandler.connections - connections_before
+
+connections_before = StandInHandler.connections
+shared_latencies = time_calls(factory.chat_model, BENCHMARK_CALLS)
+shared_connections = StandInHandler.connections - connections_before
+
+print("New model per call:  mean {:.4f}s | median {:.4f}s".format(
+    statistics.mean(fresh_latencies), statistics.median(fresh_latencies)))
+print("Factory singleton:   mean {:.4f}s | median {:.4f}s".format(
+    statistics.mean(shared_latencies), statistics.median(shared_latencies)))
+if USE_LOCAL_STAND_IN:
+    print("Connections opened on the server: {} vs {}".format(fresh_connections, shared_connections))
+
+print("\n--- Connection reuse (factory client) ---")
+print(factory.connection_metrics())
+
+factory.close()
+if server is not None:
+    server.shutdown()
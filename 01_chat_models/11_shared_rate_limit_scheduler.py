@@ -0,0 +1,421 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from dotenv import load_dotenv
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+TEXT_EMBEDDING_3_SMALL = "text-embedding-3-small"
+INTERACTIVE_LANE = 0  # Lower number = higher priority
+BULK_LANE = 1
+LANE_NAMES = {INTERACTIVE_LANE: "interactive", BULK_LANE: "bulk"}
+CHARS_PER_TOKEN = 4  # Rough estimate; the provider counts exactly, we only need to stay under budget
+TOKENS_PER_MESSAGE = 3
+DEFAULT_COMPLETION_TOKENS = 256  # Providers count max_tokens against TPM up front
+BURST_SECONDS = 1.0  # Bucket capacity; providers enforce per-minute limits over shorter windows
+DEFAULT_PAUSE_SECONDS = 1.0  # Pause after a 429 without a Retry-After header
+ASYNC_POLL_SECONDS = 0.005
+RECENT_WAITS = 10_000  # Wait times kept per lane for percentiles
+
+# Configure with the limits of your OpenAI organisation / tier
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 30_000
+
+# Set to False to run the demo against the OpenAI API (requires OPENAI_API_KEY).
+# The mock server enforces its own RPM/TPM and answers 429 above them.
+USE_LOCAL_STAND_IN = True
+STAND_IN_API_KEY_STR = "sk-local-stand-in"
+STAND_IN_LATENCY_SECONDS = 0.05
+STAND_IN_REQUESTS_PER_SECOND = 25
+STAND_IN_TOKENS_PER_SECOND = 2500
+SAFETY_MARGIN = 0.9  # Schedule at 90% of the mock server's limits
+CHAT_THREADS, CHAT_CALLS = 2, 15
+EMBEDDING_THREADS, EMBEDDING_BATCHES, EMBEDDING_BATCH_SIZE = 4, 3, 8
+
+
+class TokenBucket:
+    """Refills continuously at `rate` per second up to `capacity`; the level may go negative."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def seconds_until(self, amount):
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+class TokenBucketScheduler:
+    """Process-wide gate enforcing requests-per-minute and tokens-per-minute budgets.
+
+    Callers wait in a priority queue (lane, arrival order); only the head of the queue may take
+    from the buckets, so interactive requests overtake queued bulk work but never starve behind
+    it. A 429 from the provider pauses every lane for the Retry-After time instead of letting
+    each client retry on its own. Works from threads (acquire) and coroutines (aacquire).
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 burst_seconds=BURST_SECONDS):
+        request_rate, token_rate = requests_per_minute / 60, tokens_per_minute / 60
+        self.requests = TokenBucket(request_rate, max(1.0, request_rate * burst_seconds))
+        self.tokens = TokenBucket(token_rate, max(1.0, token_rate * burst_seconds))
+        self._paused_until = 0.0
+        self._waiting = []  # Heap of (lane, sequence, ticket)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self.rate_limited = 0
+        self.lanes = {}
+
+    def _lane_stats(self, lane):
+        return self.lanes.setdefault(lane, {"requests": 0, "tokens": 0, "queue_depth": 0, "max_queue_depth": 0,
+                                            "waits": deque(maxlen=RECENT_WAITS)})
+
+    def _enqueue(self, lane, tokens):
+        # A request larger than the bucket waits for a full bucket but is charged in full, so the
+        # level goes negative and later callers wait until the overdraft has refilled
+        ticket = {"lane": lane, "tokens": tokens, "admit_tokens": min(tokens, self.tokens.capacity),
+                  "enqueued": time.monotonic()}
+        heapq.heappush(self._waiting, (lane, next(self._sequence), ticket))
+        stats = self._lane_stats(lane)
+        stats["queue_depth"] += 1
+        stats["max_queue_depth"] = max(stats["max_queue_depth"], stats["queue_depth"])
+        self._condition.notify_all()  # The head of the queue may have changed
+        return ticket
+
+    def _try_acquire(self, ticket):
+        """0 when acquired, seconds to wait, or None to wait until the queue head changes."""
+        if self._waiting[0][2] is not ticket:
+            return None
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        wait = max(self.requests.seconds_until(1), self.tokens.seconds_until(ticket["admit_tokens"]))
+        if wait > 0:
+            return wait
+        self.requests.level -= 1
+        self.tokens.level -= ticket["tokens"]
+        heapq.heappop(self._waiting)
+        stats = self._lane_stats(ticket["lane"])
+        stats["requests"] += 1
+        stats["tokens"] += ticket["tokens"]
+        stats["queue_depth"] -= 1
+        stats["waits"].append(now - ticket["enqueued"])
+        self._condition.notify_all()
+        return 0
+
+    def _abandon(self, ticket):
+        self._waiting = [entry for entry in self._waiting if entry[2] is not ticket]
+        heapq.heapify(self._waiting)
+        self._lane_stats(ticket["lane"])["queue_depth"] -= 1
+        self._condition.notify_all()
+
+    def acquire(self, lane, tokens):
+        with self._condition:
+            ticket = self._enqueue(lane, tokens)
+            try:
+                while True:
+                    wait = self._try_acquire(ticket)
+                    if wait == 0:
+                        return
+                    self._condition.wait(timeout=wait)
+            except BaseException:
+                self._abandon(ticket)
+                raise
+
+    async def aacquire(self, lane, tokens):
+        with self._condition:
+            ticket = self._enqueue(lane, tokens)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_acquire(ticket)
+                if wait == 0:
+                    return
+                await asyncio.sleep(ASYNC_POLL_SECONDS if wait is None else wait)
+        except BaseException:
+            with self._condition:
+                self._abandon(ticket)
+            raise
+
+    def on_rate_limited(self, retry_after=None):
+        with self._condition:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or DEFAULT_PAUSE_SECONDS))
+            self.requests.level = 0.0  # Our view of the budget was too optimistic
+
+    def metrics(self):
+        with self._condition:
+            report = {"rate_limited": self.rate_limited}
+            for lane, stats in sorted(self.lanes.items()):
+                waits = sorted(stats["waits"])
+                report[LANE_NAMES.get(lane, lane)] = {
+                    "requests": stats["requests"],
+                    "tokens": stats["tokens"],
+                    "queue_depth": stats["queue_depth"],
+                    "max_queue_depth": stats["max_queue_depth"],
+                    "wait_p50_ms": statistics.median(waits) * 1000 if waits else 0.0,
+                    "wait_p95_ms": waits[int(0.95 * (len(waits) - 1))] * 1000 if waits else 0.0,
+                    "wait_max_ms": waits[-1] * 1000 if waits else 0.0,
+                }
+            return report
+
+
+_lane_override = contextvars.ContextVar("scheduler_lane", default=None)
+
+
+@contextmanager
+def priority_lane(lane):
+    """Send the OpenAI calls made inside this block through `lane`, e.g. a bulk chat job."""
+    token = _lane_override.set(lane)
+    try:
+        yield
+    finally:
+        _lane_override.reset(token)
+
+
+def estimate_request_tokens(body):
+    """Estimate what the provider will count against TPM for a chat or embeddings request body."""
+    if "messages" in body:
+        prompt = sum(TOKENS_PER_MESSAGE + len(str(message.get("content") or "")) // CHARS_PER_TOKEN
+                     for message in body["messages"])
+        return prompt + (body.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+    items = body.get("input") or []
+    if not isinstance(items, list) or (items and isinstance(items[0], int)):
+        items = [items]
+    # OpenAIEmbeddings sends token id lists when check_embedding_ctx_length is on
+    return sum(len(item) if isinstance(item, list) else len(str(item)) // CHARS_PER_TOKEN + 1 for item in items)
+
+
+def classify_request(request):
+    try:
+        body = json.loads(request.content or b"{}")
+    except ValueError:
+        body = {}
+    lane = _lane_override.get()
+    if lane is None:
+        lane = BULK_LANE if request.url.path.endswith("/embeddings") else INTERACTIVE_LANE
+    return lane, estimate_request_tokens(body)
+
+
+def retry_after_seconds(headers):
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ScheduledTransport(httpx.HTTPTransport):
+    def __init__(self, scheduler, **kwargs):
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+
+    def handle_request(self, request):
+        self.scheduler.acquire(*classify_request(request))
+        response = super().handle_request(request)
+        if response.status_code == 429:
+            self.scheduler.on_rate_limited(retry_after_seconds(response.headers))
+        return response
+
+
+class AsyncScheduledTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, scheduler, **kwargs):
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+
+    async def handle_async_request(self, request):
+        await self.scheduler.aacquire(*classify_request(request))
+        response = await super().handle_async_request(request)
+        if response.status_code == 429:
+            self.scheduler.on_rate_limited(retry_after_seconds(response.headers))
+        return response
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide scheduler; every scheduled client shares its budgets."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TokenBucketScheduler()
+        return _scheduler
+
+
+def scheduled_http_clients(scheduler=None):
+    """httpx clients to pass to ChatOpenAI/OpenAIEmbeddings as http_client and http_async_client."""
+    scheduler = scheduler or get_scheduler()
+    return (httpx.Client(transport=ScheduledTransport(scheduler)),
+            httpx.AsyncClient(transport=AsyncScheduledTransport(scheduler)))
+
+
+# --- Local mock server with its own rate limits ---
+
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    request_bucket = None
+    token_bucket = None
+    served = 0
+    rejected = 0
+
+    @classmethod
+    def reset(cls):
+        cls.request_bucket = TokenBucket(STAND_IN_REQUESTS_PER_SECOND, STAND_IN_REQUESTS_PER_SECOND)
+        cls.token_bucket = TokenBucket(STAND_IN_TOKENS_PER_SECOND, STAND_IN_TOKENS_PER_SECOND)
+        cls.served = cls.rejected = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        tokens = estimate_request_tokens(request)
+        cls = RateLimitedHandler
+        with cls.lock:
+            now = time.monotonic()
+            cls.request_bucket.refill(now)
+            cls.token_bucket.refill(now)
+            allowed = cls.request_bucket.level >= 1 and cls.token_bucket.level >= tokens
+            if allowed:
+                cls.request_bucket.level -= 1
+                cls.token_bucket.level -= tokens
+                cls.served += 1
+            else:
+                cls.rejected += 1
+                wait = max(cls.request_bucket.seconds_until(1), cls.token_bucket.seconds_until(tokens))
+        if not allowed:
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                            {"retry-after-ms": str(int(wait * 1000) + 1)})
+            return
+        time.sleep(STAND_IN_LATENCY_SECONDS)
+        if self.path.endswith("/embeddings"):
+            inputs = request["input"] if isinstance(request["input"], list) else [request["input"]]
+            self._send_json(200, {
+                "object": "list",
+                "model": request["model"],
+                "data": [{"object": "embedding", "index": i, "embedding": [0.1] * 8} for i in range(len(inputs))],
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            })
+        else:
+            self._send_json(200, {
+                "id": "chatcmpl-local",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "81 divided by 9 is 9."}}],
+                "usage": {"prompt_tokens": tokens, "completion_tokens": 8, "total_tokens": tokens + 8},
+            })
+
+
+def start_mock_server():
+    RateLimitedHandler.reset()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RateLimitedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:{}/v1".format(server.server_address[1])
+
+
+def run_workload(chat_model, embeddings):
+    """Interactive chat threads and bulk embedding threads sharing one provider."""
+    failures = []
+    texts = ["Odysseus sails home from Troy, chapter {}.".format(i).ljust(60) for i in range(EMBEDDING_BATCH_SIZE)]
+
+    def chat():
+        for _ in range(CHAT_CALLS):
+            try:
+                chat_model.invoke("What is 81 divided by 9?")
+            except Exception as e:
+                failures.append(e)
+
+    def embed():
+        for _ in range(EMBEDDING_BATCHES):
+            try:
+                embeddings.embed_documents(texts)
+            except Exception as e:
+                failures.append(e)
+
+    threads = ([threading.Thread(target=chat) for _ in range(CHAT_THREADS)]
+               + [threading.Thread(target=embed) for _ in range(EMBEDDING_THREADS)])
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, len(failures)
+
+
+if USE_LOCAL_STAND_IN:
+    server, base_url = start_mock_server()
+    client_kwargs = {"openai_api_base": base_url, "openai_api_key": STAND_IN_API_KEY_STR}
+    scheduler = TokenBucketScheduler(requests_per_minute=STAND_IN_REQUESTS_PER_SECOND * 60 * SAFETY_MARGIN,
+                                     tokens_per_minute=STAND_IN_TOKENS_PER_SECOND * 60 * SAFETY_MARGIN)
+else:
+    server, client_kwargs = None, {}
+    scheduler = get_scheduler()
+
+# max_tokens counts against TPM, so keep it as small as the answer needs
+chat_kwargs = dict(model=GPT_4O_MODEL_STR, max_tokens=64, **client_kwargs)
+# Without the length check OpenAIEmbeddings sends one request per text (and needs no tiktoken download)
+embedding_kwargs = dict(model=TEXT_EMBEDDING_3_SMALL, check_embedding_ctx_length=False, **client_kwargs)
+
+if USE_LOCAL_STAND_IN:
+    print("\n--- Without the scheduler ---")
+    seconds, failures = run_workload(ChatOpenAI(**chat_kwargs), OpenAIEmbeddings(**embedding_kwargs))
+    print("{:.2f}s, {} failed calls, server answered {} requests and rejected {} with 429".format(
+        seconds, failures, RateLimitedHandler.served, RateLimitedHandler.rejected))
+    RateLimitedHandler.reset()
+
+print("\n--- With the shared scheduler ---")
+http_client, http_async_client = scheduled_http_clients(scheduler)
+chat_model = ChatOpenAI(http_client=http_client, http_async_client=http_async_client, **chat_kwargs)
+embeddings = OpenAIEmbeddings(http_client=http_client, http_async_client=http_async_client, **embedding_kwargs)
+seconds, failures = run_workload(chat_model, embeddings)
+if USE_LOCAL_STAND_IN:
+    print("{:.2f}s, {} failed calls, server answered {} requests and rejected {} with 429".format(
+        seconds, failures, RateLimitedHandler.served, RateLimitedHandler.rejected))
+else:
+    print("{:.2f}s, {} failed calls".format(seconds, failures))
+
+print("\n--- Scheduler metrics ---")
+for key, value in scheduler.metrics().items():
+    if isinstance(value, dict):
+        value = {name: round(number, 1) if isinstance(number, float) else number for name, number in value.items()}
+    print("{}: {}".format(key, value))
+
+http_client.close()
+if server is not None:
+    server.shutdown()
@@ -0,0 +1,241 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, List, Optional
+
+from dotenv import load_dotenv
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+INITIAL_CONCURRENCY = 4
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 64
+LATENCY_TOLERANCE = 2.0  # Back off once latency exceeds this multiple of the best latency seen
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BATCH_SIZE = 200
+
+# Set to False to run the batch against the OpenAI API (requires OPENAI_API_KEY)
+USE_LOCAL_STAND_IN = True
+STAND_IN_CAPACITY = 6  # Concurrent requests before answering 429; low enough that the run backs off
+STAND_IN_LATENCY_SECONDS = 0.2
+
+
+def is_rate_limit_error(error):
+    """True for HTTP 429 errors from openai (RateLimitError) or any client exposing status_code."""
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def count_tokens(message):
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return usage.get("total_tokens", 0)
+    return message.response_metadata.get("token_usage", {}).get("total_tokens", 0)
+
+
+class AdaptiveBatchRunner:
+    """Runs a prompt template + chat model over many inputs with adaptive, bounded concurrency.
+
+    Concurrency follows an additive-increase/multiplicative-decrease rule: it grows by about one
+    request per round of successful calls, halves on a 429, and shrinks a little when latency
+    climbs above LATENCY_TOLERANCE times the best latency seen (the provider is queueing).
+    Inputs are pulled lazily and results are yielded in input order.
+    """
+
+    def __init__(self, prompt_template, model, initial_concurrency=INITIAL_CONCURRENCY,
+                 min_concurrency=MIN_CONCURRENCY, max_concurrency=MAX_CONCURRENCY, max_retries=MAX_RETRIES):
+        self.chain = prompt_template | model
+        self.concurrency = float(initial_concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.best_latency = None
+        self.stats = {"requests": 0, "succeeded": 0, "failed": 0, "rate_limited": 0, "tokens": 0,
+                      "peak_concurrency": initial_concurrency, "seconds": 0.0}
+
+    def _on_success(self, latency):
+        if self.best_latency is None or latency < self.best_latency:
+            self.best_latency = latency
+        if latency > self.best_latency * LATENCY_TOLERANCE:
+            self.concurrency = max(self.min_concurrency, self.concurrency * 0.9)
+        else:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+        self.stats["peak_concurrency"] = max(self.stats["peak_concurrency"], int(self.concurrency))
+
+    def _on_rate_limited(self):
+        self.stats["rate_limited"] += 1
+        self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+
+    async def _call(self, variables):
+        for attempt in range(self.max_retries + 1):
+            self.stats["requests"] += 1
+            start = time.perf_counter()
+            try:
+                result = await self.chain.ainvoke(variables)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    self.stats["failed"] += 1
+                    return e
+                self._on_rate_limited()
+                delay = retry_after_seconds(e) or BACKOFF_BASE_SECONDS * 2 ** attempt
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))  # Jitter avoids retry storms
+                continue
+            self._on_success(time.perf_counter() - start)
+            self.stats["succeeded"] += 1
+            self.stats["tokens"] += count_tokens(result)
+            return result
+
+    async def run(self, inputs):
+        """Yield one result per input dict, in input order; failures are yielded as exceptions.
+
+        Calls still in flight are cancelled if the consumer stops iterating early.
+        """
+        start = time.perf_counter()
+        iterator = iter(inputs)
+        pending = {}  # Input index -> task
+        finished = {}  # Completed results waiting for earlier inputs to finish
+        next_index, next_to_yield, exhausted = 0, 0, False
+        try:
+            while True:
+                # Finished results count against the window too, so one slow input bounds memory
+                while not exhausted and len(pending) + len(finished) < max(1, int(self.concurrency)):
+                    try:
+                        variables = next(iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[next_index] = asyncio.create_task(self._call(variables))
+                    next_index += 1
+                if not pending:
+                    break
+                done, _ = await asyncio.wait(pending.values(), return_when=asyncio.FIRST_COMPLETED)
+                for index in [index for index, task in pending.items() if task in done]:
+                    finished[index] = pending.pop(index).result()
+                while next_to_yield in finished:
+                    yield finished.pop(next_to_yield)
+                    next_to_yield += 1
+        finally:
+            for task in pending.values():
+                task.cancel()
+            self.stats["seconds"] += time.perf_counter() - start
+
+    async def run_all(self, inputs):
+        return [result async for result in self.run(inputs)]
+
+    def throughput(self):
+        seconds = self.stats["seconds"] or float("inf")
+        return {
+            "requests_per_second": self.stats["succeeded"] / seconds,
+            "tokens_per_second": self.stats["tokens"] / seconds,
+            **self.stats,
+        }
+
+
+class StandInRateLimitError(Exception):
+    status_code = 429
+
+
+_stand_in_lock = threading.Lock()  # Sync calls may run on several threads
+
+
+class RateLimitedStandInModel(BaseChatModel):
+    """Local stand-in that slows down under load and answers 429 above its capacity.
+
+    Sync and async calls count against the same capacity.
+    """
+
+    capacity: int = STAND_IN_CAPACITY
+    latency: float = STAND_IN_LATENCY_SECONDS
+    in_flight: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "rate-limited-stand-in"
+
+    def _admit(self):
+        """Take a slot and return the call's latency, or raise a 429 when the stand-in is full."""
+        with _stand_in_lock:
+            if self.in_flight >= self.capacity:
+                raise StandInRateLimitError("429 Too Many Requests")
+            self.in_flight += 1
+            # Latency rises as the stand-in approaches its capacity, like a busy provider
+            return self.latency * (1 + self.in_flight / self.capacity) * random.uniform(0.8, 1.2)
+
+    def _release(self):
+        with _stand_in_lock:
+            self.in_flight -= 1
+
+    def _result(self):
+        message = AIMessage(content="Here are your jokes.",
+                            usage_metadata={"input_tokens": 20, "output_tokens": 12, "total_tokens": 32})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        latency = self._admit()
+        try:
+            time.sleep(latency)
+        finally:
+            self._release()
+        return self._result()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        latency = self._admit()
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            self._release()
+        return self._result()
+
+
+if USE_LOCAL_STAND_IN:
+    model = RateLimitedStandInModel()
+else:
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI(model=GPT_4O_MODEL_STR)
+
+prompt_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", "You are a comedian who tells jokes about {topic}."),
+        ("human", "Tell me {joke_count} jokes."),
+    ]
+)
+
+topics = ["lawyers", "cats", "pandas", "accountants", "pirates"]
+inputs = ({"topic": topics[i % len(topics)], "joke_count": 1 + i % 3} for i in range(BATCH_SIZE))
+
+runner = AdaptiveBatchRunner(prompt_template, model)
+results = asyncio.run(runner.run_all(inputs))
+
+print("\n--- Adaptive batch run ({} inputs) ---".format(len(results)))
+print("First result: {}".format(results[0].content if isinstance(results[0], AIMessage) else results[0]))
+for key, value in runner.throughput().items():
+    print("{}: {}".format(key, round(value, 2) if isinstance(value, float) else value))
+
+if USE_LOCAL_STAND_IN:
+    # Serial baseline over a sample, as in 02_prompt_template_with_chat_model.py
+    sample_size = 20
+    start = time.perf_counter()
+    for i in range(sample_size):
+        prompt = prompt_template.invoke({"topic": topics[i % len(topics)], "joke_count": 1})
+        model.invoke(prompt)
+    serial_rate = sample_size / (time.perf_counter() - start)
+    print("\nSerial baseline: {:.2f} requests/s".format(serial_rate))
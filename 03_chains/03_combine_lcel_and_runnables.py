@@ -1,7 +1,9 @@
+import time
+
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.output_parser import StrOutputParser
-from langchain.schema.runnable import RunnableLambda
+from langchain.schema.runnable import RunnableGenerator, RunnableLambda
 from langchain_openai import ChatOpenAI
 
 load_dotenv()
@@ -16,11 +18,55 @@ prompt_template = ChatPromptTemplate.from_messages(
 )
 
 # Define additional processing steps
+# These need the whole string, so chain.stream yields nothing until the model has finished
 uppercase_output = RunnableLambda(lambda x: x.upper())
 count_words = RunnableLambda(lambda x: "Word count: {}\n".format(len(x.split())))
 
+
+# Streaming versions work on each chunk as it arrives
+def uppercase_chunks(chunks):
+    for chunk in chunks:
+        yield chunk.upper()
+
+
+def count_words_chunks(chunks):
+    """Pass chunks through while counting words; the final count is emitted after the last chunk."""
+    word_count, in_word = 0, False
+    for chunk in chunks:
+        if chunk:
+            word_count += len(chunk.split())
+            if in_word and not chunk[0].isspace():
+                word_count -= 1  # The word started in the previous chunk
+            in_word = not chunk[-1].isspace()
+        yield chunk
+    yield "\nWord count: {}\n".format(word_count)
+
+
 chain = prompt_template | model | StrOutputParser() | uppercase_output | count_words
+streaming_chain = (
+    prompt_template | model | StrOutputParser() | RunnableGenerator(uppercase_chunks) | RunnableGenerator(count_words_chunks)
+)
 
 result = chain.invoke({"topic": "lawyers", "joke_count": 3})
 
 print(result)
+
+
+def time_to_first_chunk(runnable, inputs):
+    start = time.perf_counter()
+    first_chunk_seconds = None
+    for chunk in runnable.stream(inputs):
+        if first_chunk_seconds is None:
+            first_chunk_seconds = time.perf_counter() - start
+        print(chunk, end="", flush=True)
+    return first_chunk_seconds, time.perf_counter() - start
+
+
+print("\n--- Streaming chain ---")
+streaming_first, streaming_total = time_to_first_chunk(streaming_chain, {"topic": "lawyers", "joke_count": 3})
+
+print("\n--- Blocking chain (stream) ---")
+blocking_first, blocking_total = time_to_first_chunk(chain, {"topic": "lawyers", "joke_count": 3})
+
+print("\nTime to first chunk: {:.2f}s blocking vs {:.2f}s streaming".format(blocking_first, streaming_first))
+print("Total time: {:.2f}s blocking vs {:.2f}s streaming".format(blocking_total, streaming_total))
@@ -17,23 +17,27 @@ prompt_template = ChatPromptTemplate.from_messages(
 )
 
 
+# Build the branch templates once instead of on every analyze_pros/analyze_cons call
+pros_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_MSG_EXPERT_REVIEWER),
+        ("human", "Given these features: {features}, list the pros of these features."),
+    ]
+)
+
+cons_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_MSG_EXPERT_REVIEWER),
+        ("human", "Given these features: {features}, list the cons of these features."),
+    ]
+)
+
+
 def analyze_pros(features):
-    pros_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_MSG_EXPERT_REVIEWER),
-            ("human", "Given these features: {features}, list the pros of these features."),
-        ]
-    )
     return pros_template.format_prompt(features=features)
 
 
 def analyze_cons(features):
-    cons_template = ChatPromptTemplate.from_messages(
-        [
-            ("system", SYSTEM_MSG_EXPERT_REVIEWER),
-            ("human", "Given these features: {features}, list the cons of these features."),
-        ]
-    )
     return cons_template.format_prompt(features=features)
 
 
@@ -0,0 +1,217 @@
+import csv
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+
+import tiktoken
+from dotenv import load_dotenv
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+from langchain.schema.runnable import RunnableLambda
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+FALLBACK_ENCODING_STR = "cl100k_base"
+TOKENS_PER_MESSAGE = 3  # Per-message overhead of the chat format
+REPORTS_DIR_STR = "reports"
+JSON_REPORT_STR = "token_cost_report.json"
+CSV_REPORT_STR = "token_cost_report.csv"
+
+# USD per 1M tokens as (prompt, completion). Update as provider pricing changes.
+MODEL_PRICES_PER_1M_TOKENS = {
+    "gpt-4o": (5.00, 15.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+# Set to False to run the chains against the OpenAI API (requires OPENAI_API_KEY)
+USE_LOCAL_STAND_IN = True
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+reports_dir = os.path.join(current_dir, REPORTS_DIR_STR)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name):
+    """Load each tokenizer once per process; loading one takes far longer than encoding."""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding(FALLBACK_ENCODING_STR)
+
+
+@lru_cache(maxsize=8192)
+def count_text_tokens(model_name, text):
+    """Token count of a string; repeated strings such as system prompts are counted once."""
+    return len(get_encoding(model_name).encode(text))
+
+
+def count_message_tokens(model_name, messages):
+    return sum(TOKENS_PER_MESSAGE + count_text_tokens(model_name, str(message.content)) for message in messages)
+
+
+def run_name(serialized, kwargs):
+    if kwargs.get("name"):
+        return kwargs["name"]
+    if serialized:
+        return serialized.get("name") or serialized.get("id", ["unknown"])[-1]
+    return "unknown"
+
+
+class TokenCostCallbackHandler(BaseCallbackHandler):
+    """Records tokens, latency and estimated cost per prompt template, model call and chain step.
+
+    Model calls are attributed to the prompt template rendered just before them in the same
+    sequence, so `template | model` steps are reported under the template's run name. Give
+    templates distinct names with `.with_config(run_name="...")`.
+    """
+
+    def __init__(self, default_model=GPT_4O_MODEL_STR):
+        self.default_model = default_model
+        self.stats = {}  # (kind, name) -> aggregated counters
+        self._runs = {}  # run_id -> (kind, name, start time, parent_run_id, prompt tokens, model)
+        self._last_template = {}  # parent_run_id -> name of the last template rendered under it
+        self._lock = threading.Lock()
+
+    def _record(self, kind, name, latency, prompt_tokens=0, completion_tokens=0, cost=0.0):
+        with self._lock:
+            entry = self.stats.setdefault((kind, name), {
+                "kind": kind, "name": name, "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "total_latency": 0.0, "max_latency": 0.0, "cost_usd": 0.0,
+            })
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["total_latency"] += latency
+            entry["max_latency"] = max(entry["max_latency"], latency)
+            entry["cost_usd"] += cost
+
+    # --- Prompt templates and other chain steps ---
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        kind = "prompt" if kwargs.get("run_type") == "prompt" else "step"
+        self._runs[run_id] = (kind, run_name(serialized, kwargs), time.perf_counter(), parent_run_id, 0, None)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._last_template.pop(run_id, None)  # Its model calls are done
+        kind, name, start, parent_run_id, _, _ = self._runs.pop(run_id, (None,) * 6)
+        if kind is None:
+            return
+        latency = time.perf_counter() - start
+        if kind == "prompt":
+            prompt_tokens = count_message_tokens(self.default_model, outputs.to_messages())
+            self._last_template[parent_run_id] = name
+            self._record("prompt", name, latency, prompt_tokens=prompt_tokens)
+        elif parent_run_id is not None:  # Only steps inside a chain, not the whole chain again
+            self._record("step", name, latency)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._last_template.pop(run_id, None)
+        self._runs.pop(run_id, None)
+
+    # --- Chat model calls ---
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or self.default_model
+        name = self._last_template.get(parent_run_id, run_name(serialized, kwargs))
+        prompt_tokens = sum(count_message_tokens(model, batch) for batch in messages)
+        self._runs[run_id] = ("llm", name, time.perf_counter(), parent_run_id, prompt_tokens, model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        kind, name, start, _, prompt_tokens, model = self._runs.pop(run_id, (None,) * 6)
+        if kind is None:
+            return
+        latency = time.perf_counter() - start
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        # Prefer the provider's own counts; fall back to counting locally
+        prompt_tokens = usage.get("prompt_tokens", prompt_tokens)
+        completion_tokens = usage.get("completion_tokens")
+        if completion_tokens is None:
+            completion_tokens = sum(count_text_tokens(model, generation.text)
+                                    for generations in response.generations for generation in generations)
+        prompt_price, completion_price = MODEL_PRICES_PER_1M_TOKENS.get(model, (0.0, 0.0))
+        cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+        self._record("llm", "{} ({})".format(name, model), latency, prompt_tokens, completion_tokens, cost)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._runs.pop(run_id, None)
+
+    # --- Reporting ---
+
+    def rows(self):
+        with self._lock:
+            rows = [dict(entry, mean_latency=entry["total_latency"] / entry["calls"]) for entry in self.stats.values()]
+        return sorted(rows, key=lambda row: (row["kind"], -row["cost_usd"], -row["total_latency"]))
+
+    def export_json(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.rows(), f, indent=2)
+
+    def export_csv(self, path):
+        rows = self.rows()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["kind", "name"])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def print_table(self):
+        print("{:<6} {:<40} {:>6} {:>10} {:>12} {:>11} {:>11}".format(
+            "Kind", "Name", "Calls", "Prompt tk", "Completion", "Mean lat.", "Cost USD"))
+        for row in self.rows():
+            print("{kind:<6} {name:<40} {calls:>6} {prompt_tokens:>10} {completion_tokens:>12} "
+                  "{mean_latency:>10.4f}s {cost_usd:>11.6f}".format(**row))
+
+
+if USE_LOCAL_STAND_IN:
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    model = FakeListChatModel(responses=[
+        "Why did the lawyer cross the road? To sue the chicken. " * 3,
+        "Features: Retina display, M3 chip, 22-hour battery life.",
+    ])
+else:
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI(model=GPT_4O_MODEL_STR)
+
+token_cost_handler = TokenCostCallbackHandler()
+config = {"callbacks": [token_cost_handler]}
+
+# Templates from 02_prompt_templates, named so they are reported separately
+joke_template = ChatPromptTemplate.from_template("Tell me a joke about {topic}").with_config(run_name="joke")
+story_template = ChatPromptTemplate.from_template(
+    """You are a helpful assistant.
+Human: Tell me a {adjective} short story about a {animal}.
+Assistant:""").with_config(run_name="short_story")
+comedian_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", "You are a comedian who tells jokes about {topic}."),
+        ("human", "Tell me {joke_count} jokes."),
+    ]
+).with_config(run_name="comedian")
+
+# Chain from 03_combine_lcel_and_runnables.py
+uppercase_output = RunnableLambda(lambda x: x.upper()).with_config(run_name="uppercase_output")
+count_words = RunnableLambda(lambda x: "Word count: {}\n".format(len(x.split()))).with_config(run_name="count_words")
+comedian_chain = comedian_template | model | StrOutputParser() | uppercase_output | count_words
+
+for topic in ["lawyers", "cats", "pandas"]:
+    (joke_template | model).invoke({"topic": topic}, config=config)
+(story_template | model).invoke({"adjective": "funny", "animal": "panda"}, config=config)
+print(comedian_chain.invoke({"topic": "lawyers", "joke_count": 3}, config=config))
+
+print("\n--- Token and cost report ---")
+token_cost_handler.print_table()
+
+token_cost_handler.export_json(os.path.join(reports_dir, JSON_REPORT_STR))
+token_cost_handler.export_csv(os.path.join(reports_dir, CSV_REPORT_STR))
+print("\nReports written to {}".format(reports_dir))
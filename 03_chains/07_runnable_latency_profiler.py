@@ -0,0 +1,308 @@
+import json
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+from langchain.schema.runnable import RunnableBranch, RunnableLambda, RunnableParallel
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+REPORTS_DIR_STR = "reports"
+CHROME_TRACE_STR = "chain_profile.trace.json"  # Open in chrome://tracing or https://ui.perfetto.dev
+SPEEDSCOPE_STR = "chain_profile.speedscope.json"  # Open in https://www.speedscope.app
+LLM_CATEGORY_STR = "llm"
+LAMBDA_CATEGORY_STR = "lambda"
+FRAMEWORK_CATEGORY_STR = "framework"
+
+# Set to False to profile the chains against the OpenAI API (requires OPENAI_API_KEY)
+USE_LOCAL_STAND_IN = True
+STAND_IN_LATENCY_SECONDS = 0.3
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+reports_dir = os.path.join(current_dir, REPORTS_DIR_STR)
+
+
+class RunRecord:
+    def __init__(self, run_id, parent_run_id, name, category):
+        self.run_id = run_id
+        self.parent_run_id = parent_run_id
+        self.name = name
+        self.category = category
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        self.end = None
+        self.cpu_time = None
+        self.children = []
+
+    def finish(self):
+        self.end = time.perf_counter()
+        # thread_time is per thread, so CPU time is only known when the run ends where it started
+        if threading.get_ident() == self.thread_id:
+            self.cpu_time = time.thread_time() - self.cpu_start
+
+    @property
+    def wall_time(self):
+        return self.end - self.start
+
+    @property
+    def self_time(self):
+        """Wall time not covered by any child; overlapping (parallel) children count once."""
+        covered, cursor = 0.0, self.start
+        for child in sorted((c for c in self.children if c.end is not None), key=lambda c: c.start):
+            child_start, child_end = max(child.start, cursor), min(child.end, self.end)
+            if child_end > child_start:
+                covered += child_end - child_start
+                cursor = child_end
+        return max(0.0, self.wall_time - covered)
+
+
+def categorize(serialized, name, run_type):
+    if run_type == LLM_CATEGORY_STR:
+        return LLM_CATEGORY_STR
+    class_path = (serialized or {}).get("id") or []
+    if (class_path and class_path[-1] == "RunnableLambda") or name == "RunnableLambda":
+        return LAMBDA_CATEGORY_STR
+    if class_path or run_type in ("prompt", "parser") or name.startswith("Runnable"):
+        return FRAMEWORK_CATEGORY_STR
+    # Newer langchain_core versions send no serialized form for lambdas, named after their function
+    return LAMBDA_CATEGORY_STR
+
+
+class RunnableProfiler(BaseCallbackHandler):
+    """Callback handler recording wall and CPU time of every Runnable in a chain.
+
+    Every run (sequence, parallel branch, branch condition, prompt, model, parser, lambda) becomes
+    a node in a tree keyed by run_id/parent_run_id. Self time (wall time minus time covered by
+    children) splits a chain into framework overhead, LLM latency and our own lambdas.
+    """
+
+    def __init__(self):
+        self.runs = {}
+        self.roots = []
+        self._lock = threading.Lock()
+        self.origin = time.perf_counter()
+
+    def _start(self, serialized, run_id, parent_run_id, kwargs, run_type):
+        name = kwargs.get("name") or (serialized or {}).get("name") or ((serialized or {}).get("id") or ["?"])[-1]
+        run_type = kwargs.get("run_type") or run_type
+        record = RunRecord(run_id, parent_run_id, name, categorize(serialized, name, run_type))
+        with self._lock:
+            self.runs[run_id] = record
+            parent = self.runs.get(parent_run_id)
+            (parent.children if parent else self.roots).append(record)
+
+    def _end(self, run_id):
+        record = self.runs.get(run_id)
+        if record is not None:
+            record.finish()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        self._start(serialized, run_id, parent_run_id, kwargs, "chain")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start(serialized, run_id, parent_run_id, kwargs, LLM_CATEGORY_STR)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start(serialized, run_id, parent_run_id, kwargs, LLM_CATEGORY_STR)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    # --- Reports ---
+
+    def finished_runs(self):
+        return [record for record in self.runs.values() if record.end is not None]
+
+    def summary_table(self):
+        """Aggregate per Runnable name, slowest self time first."""
+        totals = {}
+        for record in self.finished_runs():
+            entry = totals.setdefault(record.name, {"category": record.category, "calls": 0, "wall": 0.0,
+                                                    "self": 0.0, "cpu": 0.0})
+            entry["calls"] += 1
+            entry["wall"] += record.wall_time
+            entry["self"] += record.self_time
+            entry["cpu"] += record.cpu_time or 0.0
+
+        lines = ["{:<34} {:<10} {:>6} {:>11} {:>11} {:>11}".format(
+            "Runnable", "Category", "Calls", "Wall (ms)", "Self (ms)", "CPU (ms)")]
+        for name, entry in sorted(totals.items(), key=lambda item: -item[1]["self"]):
+            lines.append("{:<34} {:<10} {:>6} {:>11.2f} {:>11.2f} {:>11.2f}".format(
+                name[:34], entry["category"], entry["calls"], entry["wall"] * 1000, entry["self"] * 1000,
+                entry["cpu"] * 1000))
+
+        by_category = {}
+        for record in self.finished_runs():
+            by_category[record.category] = by_category.get(record.category, 0.0) + record.self_time
+        total_self = sum(by_category.values()) or 1.0
+        lines.append("")
+        for category, seconds in sorted(by_category.items(), key=lambda item: -item[1]):
+            lines.append("{:<10} self time {:>10.2f} ms ({:.1f}%)".format(
+                category, seconds * 1000, seconds / total_self * 100))
+        return "\n".join(lines)
+
+    def _lanes(self):
+        """Assign runs to lanes in which they nest properly, so overlapping branches get their own lane."""
+        lanes = []  # Each lane is a stack of open runs
+        assignment = []
+        for record in sorted(self.finished_runs(), key=lambda r: (r.start, -r.end)):
+            for index, stack in enumerate(lanes):
+                while stack and stack[-1].end <= record.start:
+                    stack.pop()
+                if not stack or stack[-1].end >= record.end:
+                    stack.append(record)
+                    assignment.append((index, record))
+                    break
+            else:
+                lanes.append([record])
+                assignment.append((len(lanes) - 1, record))
+        return len(lanes), assignment
+
+    def to_chrome_trace(self):
+        _, assignment = self._lanes()
+        events = [{
+            "name": record.name,
+            "cat": record.category,
+            "ph": "X",
+            "ts": (record.start - self.origin) * 1e6,
+            "dur": record.wall_time * 1e6,
+            "pid": 1,
+            "tid": lane,
+            "args": {"self_ms": record.self_time * 1000,
+                     "cpu_ms": None if record.cpu_time is None else record.cpu_time * 1000},
+        } for lane, record in assignment]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_speedscope(self):
+        lane_count, assignment = self._lanes()
+        frames, frame_index = [], {}
+        profiles = []
+        for lane in range(lane_count):
+            events = []
+            for lane_of_record, record in assignment:
+                if lane_of_record != lane:
+                    continue
+                if record.name not in frame_index:
+                    frame_index[record.name] = len(frames)
+                    frames.append({"name": record.name})
+                frame = frame_index[record.name]
+                events.append(("O", (record.start - self.origin) * 1000, -record.end, frame))
+                events.append(("C", (record.end - self.origin) * 1000, -record.start, frame))
+            # At equal timestamps, close before open, and close inner runs before outer ones
+            events.sort(key=lambda e: (e[1], e[0] == "O", e[2]))
+            if events:
+                profiles.append({
+                    "type": "evented", "name": "lane {}".format(lane), "unit": "milliseconds",
+                    "startValue": events[0][1], "endValue": events[-1][1],
+                    "events": [{"type": kind, "at": at, "frame": frame} for kind, at, _, frame in events],
+                })
+        return {"$schema": "https://www.speedscope.app/file-format-schema.json",
+                "shared": {"frames": frames}, "profiles": profiles, "name": "LCEL chain profile"}
+
+    def export(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, CHROME_TRACE_STR), "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+        with open(os.path.join(directory, SPEEDSCOPE_STR), "w", encoding="utf-8") as f:
+            json.dump(self.to_speedscope(), f)
+
+
+if USE_LOCAL_STAND_IN:
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    class SlowFakeChatModel(FakeListChatModel):
+        """Fake chat model that takes `sleep` seconds per call, like an API round-trip."""
+
+        def _call(self, *args, **kwargs):
+            time.sleep(self.sleep or 0)
+            return super()._call(*args, **kwargs)
+
+    model = SlowFakeChatModel(responses=["This positive product has a great battery and a sharp screen."],
+                              sleep=STAND_IN_LATENCY_SECONDS)
+else:
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI(model=GPT_4O_MODEL_STR)
+
+# Chain from 03_combine_lcel_and_runnables.py
+prompt_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", "You are a comedian who tells jokes about {topic}."),
+        ("human", "Tell me {joke_count} jokes."),
+    ]
+)
+
+
+def uppercase(text):
+    return text.upper()
+
+
+def count_words(text):
+    return "Word count: {}\n".format(len(text.split()))
+
+
+combined_chain = prompt_template | model | StrOutputParser() | RunnableLambda(uppercase) | RunnableLambda(count_words)
+
+# Chain from 04_parallel_chains.py
+features_template = ChatPromptTemplate.from_messages(
+    [("system", "You are an expert product reviewer."), ("human", "List the main features of {product_name}.")]
+)
+pros_template = ChatPromptTemplate.from_template("Given these features: {features}, list the pros.")
+cons_template = ChatPromptTemplate.from_template("Given these features: {features}, list the cons.")
+
+
+def combine_pros_and_cons(branches):
+    return "Pros:\n{}\n\nCons:\n{}".format(branches["pros"], branches["cons"])
+
+
+parallel_chain = (
+    features_template
+    | model
+    | StrOutputParser()
+    | (lambda features: {"features": features})
+    | RunnableParallel(pros=pros_template | model | StrOutputParser(), cons=cons_template | model | StrOutputParser())
+    | RunnableLambda(combine_pros_and_cons)
+)
+
+# Chain from 05_branching_chains.py
+classification_template = ChatPromptTemplate.from_template("Classify the sentiment of this feedback: {feedback}.")
+thank_you_template = ChatPromptTemplate.from_template("Generate a thank you note for: {feedback}.")
+escalate_template = ChatPromptTemplate.from_template("Generate an escalation message for: {feedback}.")
+branching_chain = (
+    classification_template
+    | model
+    | StrOutputParser()
+    | RunnableBranch(
+        (lambda x: "positive" in x, thank_you_template | model | StrOutputParser()),
+        escalate_template | model | StrOutputParser(),
+    )
+)
+
+profiler = RunnableProfiler()
+config = {"callbacks": [profiler]}
+
+combined_chain.invoke({"topic": "lawyers", "joke_count": 3}, config=config)
+parallel_chain.invoke({"product_name": "MacBook Pro"}, config=config)
+branching_chain.invoke({"feedback": "The product is excellent."}, config=config)
+
+print("\n--- Runnable profile ---")
+print(profiler.summary_table())
+
+profiler.export(reports_dir)
+print("\nChrome trace and speedscope profiles written to {}".format(reports_dir))
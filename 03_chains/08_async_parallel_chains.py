@@ -0,0 +1,152 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from typing import Any, List, Optional
+
+from dotenv import load_dotenv
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+from langchain.schema.runnable import RunnableLambda, RunnableParallel
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+SYSTEM_MSG_EXPERT_REVIEWER = "You are an expert product reviewer."
+MAX_CONCURRENT_MODEL_CALLS = 64  # Limit across every product and every branch of a run
+THREAD_POOL_SIZE = 16  # max_concurrency for the threaded chain.batch baseline
+SERIAL_PRODUCTS = 10
+BATCH_PRODUCTS = 1000
+
+# Set to False to run against the OpenAI API (requires OPENAI_API_KEY).
+# The stand-in answers after a log-normal delay, roughly like a short gpt-4o completion.
+USE_LOCAL_STAND_IN = True
+STAND_IN_MEDIAN_LATENCY_SECONDS = 0.3
+
+
+class LatencyChatModel(BaseChatModel):
+    """Local stand-in chat model that answers after a log-normally distributed delay."""
+
+    median_latency: float = STAND_IN_MEDIAN_LATENCY_SECONDS
+    sigma: float = 0.3
+
+    @property
+    def _llm_type(self) -> str:
+        return "latency-stand-in"
+
+    def _result(self, messages):
+        content = "Features of the product: {}".format(messages[-1].content[:40])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(random.lognormvariate(0, self.sigma) * self.median_latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(random.lognormvariate(0, self.sigma) * self.median_latency)
+        return self._result(messages)
+
+
+if USE_LOCAL_STAND_IN:
+    model = LatencyChatModel()
+else:
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI(model=GPT_4O_MODEL_STR)
+
+# Budgets of in-flight model calls: one for the threaded invoke/batch path, and one per event
+# loop for ainvoke/abatch. An asyncio.Semaphore must not be used on another loop, so each loop
+# gets its own on first use; it goes away with the loop.
+sync_model_slots = threading.BoundedSemaphore(MAX_CONCURRENT_MODEL_CALLS)
+async_model_slots = weakref.WeakKeyDictionary()  # Event loop -> asyncio.Semaphore
+
+
+def call_model(prompt):
+    with sync_model_slots:
+        return model.invoke(prompt)
+
+
+async def acall_model(prompt):
+    loop = asyncio.get_running_loop()
+    if loop not in async_model_slots:
+        async_model_slots[loop] = asyncio.Semaphore(MAX_CONCURRENT_MODEL_CALLS)
+    async with async_model_slots[loop]:
+        return await model.ainvoke(prompt)
+
+
+limited_model = RunnableLambda(call_model, afunc=acall_model).with_config(run_name="limited_model")
+
+# Templates are built once at import time, as in 04_parallel_chains.py
+features_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_MSG_EXPERT_REVIEWER),
+        ("human", "List the main features of the product {product_name}."),
+    ]
+)
+pros_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_MSG_EXPERT_REVIEWER),
+        ("human", "Given these features: {features}, list the pros of these features."),
+    ]
+)
+cons_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", SYSTEM_MSG_EXPERT_REVIEWER),
+        ("human", "Given these features: {features}, list the cons of these features."),
+    ]
+)
+
+
+def combine_pros_and_cons(branches):
+    return "Pros:\n{}\n\nCons:\n{}".format(branches["pros"], branches["cons"])
+
+
+# With ainvoke/abatch, RunnableParallel runs both branches as coroutines on one event loop
+chain = (
+    features_template
+    | limited_model
+    | StrOutputParser()
+    | RunnableLambda(lambda features: {"features": features})
+    | RunnableParallel(
+        pros=pros_template | limited_model | StrOutputParser(),
+        cons=cons_template | limited_model | StrOutputParser(),
+    )
+    | RunnableLambda(combine_pros_and_cons)
+)
+
+
+def products(count):
+    return [{"product_name": "Product {}".format(i)} for i in range(count)]
+
+
+def report(label, count, seconds):
+    print("{:<32} {:>5} products in {:>7.2f}s -> {:>8.2f} products/s".format(label, count, seconds, count / seconds))
+
+
+async def run_async(inputs):
+    return await chain.abatch(inputs)
+
+
+print("\n--- Single product (async) ---")
+print(asyncio.run(chain.ainvoke({"product_name": "MacBook Pro"})))
+
+print("\n--- Throughput ---")
+start = time.perf_counter()
+for product in products(SERIAL_PRODUCTS):
+    chain.invoke(product)
+report("Serial invoke", SERIAL_PRODUCTS, time.perf_counter() - start)
+
+start = time.perf_counter()
+chain.batch(products(BATCH_PRODUCTS), config={"max_concurrency": THREAD_POOL_SIZE})
+report("Threaded batch ({} threads)".format(THREAD_POOL_SIZE), BATCH_PRODUCTS, time.perf_counter() - start)
+
+start = time.perf_counter()
+asyncio.run(run_async(products(BATCH_PRODUCTS)))
+report("Async abatch ({} model slots)".format(MAX_CONCURRENT_MODEL_CALLS), BATCH_PRODUCTS, time.perf_counter() - start)
@@ -0,0 +1,301 @@
+import re
+import time
+import zlib
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+from langchain.schema.runnable import RunnableBranch, RunnableLambda
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+SENTENCE_TRANSFORMER_MODEL_STR = "sentence-transformers/all-MiniLM-L6-v2"
+SYSTEM_MSG_HELPFUL_ASSISTANT = "You are a helpful assistant."
+SYSTEM_KEY = "system"
+HUMAN_KEY = "human"
+POSITIVE = "positive"
+NEGATIVE = "negative"
+NEUTRAL = "neutral"
+ESCALATE = "escalate"
+KEYWORD_SOURCE_STR = "keywords"
+CENTROID_SOURCE_STR = "centroid"
+LLM_SOURCE_STR = "llm"
+
+# The centroid classifier only routes when the best label is both similar enough and clearly
+# ahead of the runner-up; everything else goes to the LLM classifier as before.
+MIN_CENTROID_SIMILARITY = 0.35
+MIN_CENTROID_MARGIN = 0.08
+
+ESCALATE_KEYWORDS = ("refund", "lawyer", "manager", "human agent", "speak to someone", "chargeback",
+                     "cancel my", "unacceptable", "complaint")
+POSITIVE_KEYWORDS = ("excellent", "great", "love", "amazing", "fantastic", "perfect", "enjoyed", "helpful",
+                     "recommend")
+NEGATIVE_KEYWORDS = ("terrible", "broke", "broken", "poor", "awful", "worst", "useless", "disappointed",
+                     "waste")
+NEGATIONS = ("not", "never", "no", "hardly", "n't")
+
+
+def keyword_pattern(keywords):
+    """Whole words or phrases only, so "helpful" does not match "unhelpful" nor "love" "glove"."""
+    return re.compile(r"\b(?:{})\b".format("|".join(re.escape(keyword) for keyword in keywords)))
+
+
+ESCALATE_PATTERN = keyword_pattern(ESCALATE_KEYWORDS)
+POSITIVE_PATTERN = keyword_pattern(POSITIVE_KEYWORDS)
+NEGATIVE_PATTERN = keyword_pattern(NEGATIVE_KEYWORDS)
+
+# Labelled examples the centroids are built from; extend with real, reviewed feedback
+CENTROID_EXAMPLES = {
+    POSITIVE: [
+        "The product is excellent and I use it every day.",
+        "Really happy with this purchase, it works beautifully.",
+        "Great quality, fast delivery, would buy again.",
+        "I love how easy it is to set up.",
+    ],
+    NEGATIVE: [
+        "The product is terrible and stopped working after a week.",
+        "Very poor quality, it feels cheap and flimsy.",
+        "It broke on the first use, very disappointed.",
+        "The battery dies within an hour, not worth the money.",
+    ],
+    NEUTRAL: [
+        "The product is okay, it does what it says.",
+        "It works as expected, nothing special.",
+        "Average product for an average price.",
+        "Arrived on time. Haven't used it much yet.",
+    ],
+    ESCALATE: [
+        "I want a refund right now or I will contact my lawyer.",
+        "Let me speak to a manager about this order.",
+        "This is unacceptable, I am filing a complaint.",
+        "Cancel my subscription and return my money immediately.",
+    ],
+}
+
+# Set to False to run against the OpenAI API (requires OPENAI_API_KEY)
+USE_LOCAL_STAND_IN = True
+STAND_IN_LATENCY_SECONDS = 0.5
+
+
+class HashingEmbeddings:
+    """Dependency-free bag-of-words embeddings, used only when sentence-transformers is not installed."""
+
+    def __init__(self, size=512):
+        self.size = size
+
+    def embed_documents(self, texts):
+        vectors = np.zeros((len(texts), self.size), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"[a-z']+", text.lower()):
+                vectors[row, zlib.crc32(word.encode()) % self.size] += 1.0
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def load_embeddings():
+    try:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=SENTENCE_TRANSFORMER_MODEL_STR)
+    except ImportError:
+        print("sentence-transformers is not installed; using hashing embeddings for the centroid stage.")
+        return HashingEmbeddings()
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def has_negation(text):
+    return any(word in NEGATIONS or word.endswith("n't") for word in re.findall(r"[a-z']+", text.lower()))
+
+
+def label_from_llm_output(text):
+    """Map the LLM's free-text answer onto a label, checking labels in the branch order."""
+    text = text.lower()
+    for label in (POSITIVE, NEGATIVE, NEUTRAL):
+        if label in text:
+            return label
+    return ESCALATE
+
+
+class LocalSentimentRouter:
+    """Classifies feedback locally and only calls the LLM classifier when unsure.
+
+    Stage 1 is whole-word keyword rules: escalation phrases always escalate, and feedback with
+    only positive or only negative keywords (and no negation) is routed directly. Stage 2 is a
+    nearest-centroid classifier over sentence embeddings of CENTROID_EXAMPLES, which never
+    routes negated feedback as positive. Feedback that neither stage is confident about goes
+    to `llm_classifier`.
+    """
+
+    def __init__(self, embeddings, llm_classifier, examples=CENTROID_EXAMPLES,
+                 min_similarity=MIN_CENTROID_SIMILARITY, min_margin=MIN_CENTROID_MARGIN):
+        self.embeddings = embeddings
+        self.llm_classifier = llm_classifier
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.labels = list(examples)
+        self.centroids = normalize([
+            normalize(embeddings.embed_documents(examples[label])).mean(axis=0) for label in self.labels
+        ])
+        self.stats = {"calls": 0, KEYWORD_SOURCE_STR: 0, CENTROID_SOURCE_STR: 0, LLM_SOURCE_STR: 0,
+                      "local_seconds": 0.0, "llm_seconds": 0.0}
+
+    @staticmethod
+    def classify_keywords(feedback):
+        text = feedback.lower()
+        if ESCALATE_PATTERN.search(text):
+            return ESCALATE
+        if has_negation(text):
+            return None  # "not great" and friends are left to the later stages
+        positive = POSITIVE_PATTERN.search(text) is not None
+        negative = NEGATIVE_PATTERN.search(text) is not None
+        if positive != negative:
+            return POSITIVE if positive else NEGATIVE
+        return None
+
+    def classify_centroid(self, feedback):
+        similarities = self.centroids @ normalize(self.embeddings.embed_query(feedback))
+        best, runner_up = np.argsort(similarities)[::-1][:2]
+        if (similarities[best] >= self.min_similarity
+                and similarities[best] - similarities[runner_up] >= self.min_margin):
+            # Embeddings barely separate "great" from "not great", so negated feedback is never
+            # routed as positive without the LLM
+            if self.labels[best] == POSITIVE and has_negation(feedback):
+                return None
+            return self.labels[best]
+        return None
+
+    def classify(self, feedback):
+        """Return (label, source), where source is the stage that decided."""
+        self.stats["calls"] += 1
+        start = time.perf_counter()
+        label, source = self.classify_keywords(feedback), KEYWORD_SOURCE_STR
+        if label is None:
+            label, source = self.classify_centroid(feedback), CENTROID_SOURCE_STR
+        self.stats["local_seconds"] += time.perf_counter() - start
+        if label is None:
+            start = time.perf_counter()
+            label = label_from_llm_output(self.llm_classifier.invoke({"feedback": feedback}))
+            self.stats["llm_seconds"] += time.perf_counter() - start
+            source = LLM_SOURCE_STR
+        self.stats[source] += 1
+        return label, source
+
+    def route(self, inputs):
+        label, source = self.classify(inputs["feedback"])
+        return {**inputs, "sentiment": label, "routed_by": source}
+
+    def report(self):
+        calls = self.stats["calls"] or 1
+        skipped = self.stats[KEYWORD_SOURCE_STR] + self.stats[CENTROID_SOURCE_STR]
+        llm_calls = self.stats[LLM_SOURCE_STR]
+        # Saved time is estimated from the LLM classifier calls that did happen
+        mean_llm_seconds = self.stats["llm_seconds"] / llm_calls if llm_calls else None
+        saved = None if mean_llm_seconds is None else skipped * mean_llm_seconds - self.stats["local_seconds"]
+        return {
+            "calls": self.stats["calls"],
+            "routed_by_keywords": self.stats[KEYWORD_SOURCE_STR],
+            "routed_by_centroid": self.stats[CENTROID_SOURCE_STR],
+            "routed_by_llm": llm_calls,
+            "skipped_fraction": skipped / calls,
+            "mean_local_ms": self.stats["local_seconds"] / calls * 1000,
+            "mean_llm_classification_ms": None if mean_llm_seconds is None else mean_llm_seconds * 1000,
+            "estimated_seconds_saved": saved,
+        }
+
+
+if USE_LOCAL_STAND_IN:
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    class SlowFakeChatModel(FakeListChatModel):
+        """Fake chat model that takes `sleep` seconds per call, like an API round-trip."""
+
+        def _call(self, *args, **kwargs):
+            time.sleep(self.sleep or 0)
+            return super()._call(*args, **kwargs)
+
+    model = SlowFakeChatModel(responses=["neutral"], sleep=STAND_IN_LATENCY_SECONDS)
+else:
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI(model=GPT_4O_MODEL_STR)
+
+# Templates from 05_branching_chains.py
+positive_feedback_template = ChatPromptTemplate.from_messages(
+    [
+        (SYSTEM_KEY, SYSTEM_MSG_HELPFUL_ASSISTANT),
+        (HUMAN_KEY, "Generate a thank you note for this positive feedback: {feedback}."),
+    ]
+)
+negative_feedback_template = ChatPromptTemplate.from_messages(
+    [
+        (SYSTEM_KEY, SYSTEM_MSG_HELPFUL_ASSISTANT),
+        (HUMAN_KEY, "Generate a response addressing this negative feedback: {feedback}."),
+    ]
+)
+neutral_feedback_template = ChatPromptTemplate.from_messages(
+    [
+        (SYSTEM_KEY, SYSTEM_MSG_HELPFUL_ASSISTANT),
+        (HUMAN_KEY, "Generate a request for more details for this neutral feedback: {feedback}."),
+    ]
+)
+escalate_feedback_template = ChatPromptTemplate.from_messages(
+    [
+        (SYSTEM_KEY, SYSTEM_MSG_HELPFUL_ASSISTANT),
+        (HUMAN_KEY, "Generate a message to escalate this feedback to a human agent: {feedback}."),
+    ]
+)
+classification_template = ChatPromptTemplate.from_messages(
+    [
+        (SYSTEM_KEY, SYSTEM_MSG_HELPFUL_ASSISTANT),
+        (HUMAN_KEY, "Classify the sentiment of this feedback as positive, negative, neutral, or escalate: {feedback}."),
+    ]
+)
+
+# The LLM classifier is now only the fallback of the local router
+classification_chain = classification_template | model | StrOutputParser()
+router = LocalSentimentRouter(load_embeddings(), classification_chain)
+
+# Branches receive {"feedback", "sentiment", "routed_by"}, so templates see the original feedback
+branches = RunnableBranch(
+    (lambda x: x["sentiment"] == POSITIVE, positive_feedback_template | model | StrOutputParser()),
+    (lambda x: x["sentiment"] == NEGATIVE, negative_feedback_template | model | StrOutputParser()),
+    (lambda x: x["sentiment"] == NEUTRAL, neutral_feedback_template | model | StrOutputParser()),
+    escalate_feedback_template | model | StrOutputParser(),
+)
+
+chain = RunnableLambda(router.route).with_config(run_name="local_sentiment_router") | branches
+
+reviews = [
+    "The product is excellent. I really enjoyed using it and found it very helpful.",
+    "The product is terrible. It broke after just one use and the quality is very poor.",
+    "The product is okay. It works as expected but nothing exceptional.",
+    "I'm not sure about the product yet. Can you tell me more about its features and benefits?",
+    "I want a refund and I want to speak to a manager today.",
+    "Great screen, but the battery is awful.",
+    "Not great, not terrible.",
+    "Absolutely love it, best purchase this year!",
+    "It does the job.",
+    "Shipping took forever and the box was crushed.",
+]
+
+print("\n--- Routing ---")
+for review in reviews:
+    label, source = router.classify(review)
+    print("{:<9} via {:<9} {}".format(label, source, review))
+
+print("\n--- Chain result ---")
+print(chain.invoke({"feedback": reviews[0]}))
+
+print("\n--- Pre-router report ---")
+for key, value in router.report().items():
+    print("{}: {}".format(key, round(value, 3) if isinstance(value, float) else value))
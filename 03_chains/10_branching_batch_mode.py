@@ -0,0 +1,255 @@
+import json
+import os
+import random
+import time
+from itertools import islice
+from typing import Any, List, Optional
+
+from dotenv import load_dotenv
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+SYSTEM_MSG_HELPFUL_ASSISTANT = "You are a helpful assistant."
+SYSTEM_KEY = "system"
+HUMAN_KEY = "human"
+POSITIVE = "positive"
+NEGATIVE = "negative"
+NEUTRAL = "neutral"
+ESCALATE = "escalate"
+BATCH_DIR_STR = "batch"
+INPUT_FILE_STR = "reviews.jsonl"
+OUTPUT_FILE_STR = "responses.jsonl"
+CHECKPOINT_FILE_STR = "responses.checkpoint.json"
+CHUNK_SIZE = 200  # Records held in memory at once
+MAX_CONCURRENCY = 16  # Concurrent model calls within a .batch()
+SAMPLE_REVIEWS = 2000
+
+# Set to False to run against the OpenAI API (requires OPENAI_API_KEY)
+USE_LOCAL_STAND_IN = True
+STAND_IN_LATENCY_SECONDS = 0.05
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+batch_dir = os.path.join(current_dir, BATCH_DIR_STR)
+input_path = os.path.join(batch_dir, INPUT_FILE_STR)
+output_path = os.path.join(batch_dir, OUTPUT_FILE_STR)
+checkpoint_path = os.path.join(batch_dir, CHECKPOINT_FILE_STR)
+
+
+class SimulatedCrash(Exception):
+    pass
+
+
+def sentiment_label(classification):
+    """Map the classifier's free-text answer onto a branch, in the order of 05_branching_chains.py."""
+    for label in (POSITIVE, NEGATIVE, NEUTRAL):
+        if label in classification.lower():
+            return label
+    return ESCALATE
+
+
+def read_jsonl(path, skip=0):
+    """Yield the records of a JSONL file after the first `skip`; blank lines are not records."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in islice((line for line in f if line.strip()), skip, None):
+            yield json.loads(line)
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {"records_done": 0, "output_bytes": 0}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    # Write-then-rename, so a crash leaves either the old or the new checkpoint, never half of one
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+
+
+class BranchingBatchRunner:
+    """Runs the feedback branching chain over a JSONL file in fixed-size chunks.
+
+    Each chunk is classified with one classification_chain.batch call, grouped by branch and
+    answered with one .batch call per response chain. Results are appended to the output JSONL
+    in input order and the checkpoint records how many input records and output bytes are
+    complete. On restart, output past the checkpoint (a chunk that was being written when the
+    run died) is truncated and the input is resumed after the last finished record. Memory use
+    is bounded by CHUNK_SIZE, not by the size of the input.
+    """
+
+    def __init__(self, classification_chain, branch_chains, chunk_size=CHUNK_SIZE, max_concurrency=MAX_CONCURRENCY):
+        self.classification_chain = classification_chain
+        self.branch_chains = branch_chains
+        self.chunk_size = chunk_size
+        self.config = {"max_concurrency": max_concurrency}
+        self.stats = {"records": 0, "chunks": 0, "resumed_from": 0, "seconds": 0.0,
+                      **{label: 0 for label in branch_chains}}
+
+    def _process_chunk(self, records):
+        inputs = [{"feedback": record["feedback"]} for record in records]
+        labels = [sentiment_label(text) for text in self.classification_chain.batch(inputs, config=self.config)]
+
+        responses = [None] * len(records)
+        for label, chain in self.branch_chains.items():
+            indexes = [i for i, record_label in enumerate(labels) if record_label == label]
+            if not indexes:
+                continue
+            answers = chain.batch([inputs[i] for i in indexes], config=self.config)
+            for i, answer in zip(indexes, answers):
+                responses[i] = answer
+            self.stats[label] += len(indexes)
+
+        return [{**record, "sentiment": label, "response": response}
+                for record, label, response in zip(records, labels, responses)]
+
+    def run(self, input_path, output_path, checkpoint_path, crash_after_chunks=None):
+        start = time.perf_counter()
+        checkpoint = load_checkpoint(checkpoint_path)
+        self.stats["resumed_from"] = checkpoint["records_done"]
+
+        with open(output_path, "a+b") as output:
+            output_bytes = output.seek(0, os.SEEK_END)
+            if output_bytes < checkpoint["output_bytes"]:
+                # truncate() would pad the missing output with NUL bytes
+                raise RuntimeError("{} has {} bytes but its checkpoint records {}; delete {} to start over".format(
+                    output_path, output_bytes, checkpoint["output_bytes"], checkpoint_path))
+            output.truncate(checkpoint["output_bytes"])  # Drop a partially written chunk
+            output.seek(0, os.SEEK_END)
+            records = read_jsonl(input_path, skip=checkpoint["records_done"])
+            while True:
+                chunk = list(islice(records, self.chunk_size))
+                if not chunk:
+                    break
+                for result in self._process_chunk(chunk):
+                    output.write((json.dumps(result) + "\n").encode("utf-8"))
+                output.flush()
+                os.fsync(output.fileno())
+
+                checkpoint["records_done"] += len(chunk)
+                checkpoint["output_bytes"] = output.tell()
+                save_checkpoint(checkpoint_path, checkpoint)
+                self.stats["records"] += len(chunk)
+                self.stats["chunks"] += 1
+                if crash_after_chunks is not None and self.stats["chunks"] >= crash_after_chunks:
+                    raise SimulatedCrash("Simulated crash after {} chunks".format(self.stats["chunks"]))
+
+        self.stats["seconds"] += time.perf_counter() - start
+        return self.stats
+
+
+class FeedbackStandInModel(BaseChatModel):
+    """Local stand-in that classifies by keyword and writes short canned responses."""
+
+    latency: float = STAND_IN_LATENCY_SECONDS
+
+    @property
+    def _llm_type(self) -> str:
+        return "feedback-stand-in"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        text = messages[-1].content
+        if text.startswith("Classify"):
+            words = {"excellent": POSITIVE, "terrible": NEGATIVE, "okay": NEUTRAL}
+            content = next((label for word, label in words.items() if word in text), ESCALATE)
+        else:
+            content = "Thank you for your feedback, we will follow up shortly."
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+def write_sample_reviews(path, count):
+    reviews = [
+        "The product is excellent. I really enjoyed using it and found it very helpful.",
+        "The product is terrible. It broke after just one use and the quality is very poor.",
+        "The product is okay. It works as expected but nothing exceptional.",
+        "I'm not sure about the product yet. Can you tell me more about its features and benefits?",
+    ]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": i, "feedback": random.choice(reviews)}) + "\n")
+
+
+if USE_LOCAL_STAND_IN:
+    model = FeedbackStandInModel()
+else:
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI(model=GPT_4O_MODEL_STR)
+
+# Templates from 05_branching_chains.py
+positive_feedback_template = ChatPromptTemplate.from_messages(
+    [
+        (SYSTEM_KEY, SYSTEM_MSG_HELPFUL_ASSISTANT),
+        (HUMAN_KEY, "Generate a thank you note for this positive feedback: {feedback}."),
+    ]
+)
+negative_feedback_template = ChatPromptTemplate.from_messages(
+    [
+        (SYSTEM_KEY, SYSTEM_MSG_HELPFUL_ASSISTANT),
+        (HUMAN_KEY, "Generate a response addressing this negative feedback: {feedback}."),
+    ]
+)
+neutral_feedback_template = ChatPromptTemplate.from_messages(
+    [
+        (SYSTEM_KEY, SYSTEM_MSG_HELPFUL_ASSISTANT),
+        (HUMAN_KEY, "Generate a request for more details for this neutral feedback: {feedback}."),
+    ]
+)
+escalate_feedback_template = ChatPromptTemplate.from_messages(
+    [
+        (SYSTEM_KEY, SYSTEM_MSG_HELPFUL_ASSISTANT),
+        (HUMAN_KEY, "Generate a message to escalate this feedback to a human agent: {feedback}."),
+    ]
+)
+classification_template = ChatPromptTemplate.from_messages(
+    [
+        (SYSTEM_KEY, SYSTEM_MSG_HELPFUL_ASSISTANT),
+        (HUMAN_KEY, "Classify the sentiment of this feedback as positive, negative, neutral, or escalate: {feedback}."),
+    ]
+)
+
+classification_chain = classification_template | model | StrOutputParser()
+branch_chains = {
+    POSITIVE: positive_feedback_template | model | StrOutputParser(),
+    NEGATIVE: negative_feedback_template | model | StrOutputParser(),
+    NEUTRAL: neutral_feedback_template | model | StrOutputParser(),
+    ESCALATE: escalate_feedback_template | model | StrOutputParser(),
+}
+
+if not os.path.exists(input_path):
+    write_sample_reviews(input_path, SAMPLE_REVIEWS)
+    print("Wrote {} sample reviews to {}".format(SAMPLE_REVIEWS, input_path))
+
+if USE_LOCAL_STAND_IN and not os.path.exists(checkpoint_path):
+    # Demonstrate resuming: the first run dies part-way through
+    try:
+        BranchingBatchRunner(classification_chain, branch_chains).run(
+            input_path, output_path, checkpoint_path, crash_after_chunks=3)
+    except SimulatedCrash as e:
+        print("\n--- {} ---".format(e))
+
+runner = BranchingBatchRunner(classification_chain, branch_chains)
+stats = runner.run(input_path, output_path, checkpoint_path)
+
+print("\n--- Batch run ---")
+for key, value in stats.items():
+    print("{}: {}".format(key, round(value, 2) if isinstance(value, float) else value))
+if stats["seconds"]:
+    print("records/s: {:.2f}".format(stats["records"] / stats["seconds"]))
+
+ids = [record["id"] for record in read_jsonl(output_path)]
+print("Output records: {} ({} unique ids)".format(len(ids), len(set(ids))))
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+from langchain_core.runnables import Runnable
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+CONCURRENT_CALLERS = 50
+DISTINCT_TOPICS = ["lawyers", "cats", "pandas", "accountants", "pirates"]
+
+# Set to False to run against the OpenAI API (requires OPENAI_API_KEY)
+USE_LOCAL_STAND_IN = True
+STAND_IN_LATENCY_SECONDS = 0.5
+
+
+def default_key(input):
+    """Stable key for dict/list/str inputs; dict key order does not matter."""
+    return json.dumps(input, sort_keys=True, default=str)
+
+
+class LeaderInterruptedError(RuntimeError):
+    """Raised in followers when the leader died of KeyboardInterrupt, SystemExit or the like."""
+
+
+def _leader_interrupted(error):
+    return LeaderInterruptedError("The shared call was interrupted by {}".format(type(error).__name__))
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleflightRunnable(Runnable):
+    """Wraps a Runnable so concurrent calls with the same input share one execution.
+
+    The first caller for a key (the leader) runs the wrapped Runnable; callers arriving with
+    the same key while it is in flight wait for and return the leader's result, or re-raise
+    its exception (LeaderInterruptedError if the leader was interrupted by a BaseException such
+    as KeyboardInterrupt). Nothing is cached: once the execution finishes, the next call runs again.
+    Only the leader's config (callbacks, tags) is used for the shared execution.
+    """
+
+    def __init__(self, runnable, key_func=default_key):
+        self.runnable = runnable
+        self.key_func = key_func
+        self._lock = threading.Lock()
+        self._in_flight = {}  # key -> _InFlightCall
+        self._async_in_flight = {}  # (event loop, key) -> asyncio.Future
+        self.stats = {"calls": 0, "executions": 0, "collapsed": 0}
+
+    @property
+    def InputType(self):
+        return self.runnable.InputType
+
+    @property
+    def OutputType(self):
+        return self.runnable.OutputType
+
+    def _count(self, leader):
+        self.stats["calls"] += 1
+        self.stats["executions" if leader else "collapsed"] += 1
+
+    def invoke(self, input, config=None, **kwargs):
+        key = self.key_func(input)
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _InFlightCall()
+            self._count(leader)
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = self.runnable.invoke(input, config, **kwargs)
+            except Exception as e:
+                call.error = e
+            except BaseException as e:
+                call.error = _leader_interrupted(e)  # Followers must not mistake result None for success
+                raise
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        # Futures belong to one event loop, so keys are scoped per loop
+        key = (asyncio.get_running_loop(), self.key_func(input))
+        with self._lock:
+            future = self._async_in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._async_in_flight[key] = asyncio.get_running_loop().create_future()
+            self._count(leader)
+
+        if leader:
+            try:
+                future.set_result(await self.runnable.ainvoke(input, config, **kwargs))
+            except asyncio.CancelledError:
+                future.cancel()  # Waiters are never left hanging on a cancelled leader
+                raise
+            except Exception as e:
+                future.set_exception(e)
+            except BaseException as e:
+                future.set_exception(_leader_interrupted(e))
+                raise
+            finally:
+                with self._lock:
+                    del self._async_in_flight[key]
+        # shield: a cancelled follower must not cancel the shared execution
+        return await asyncio.shield(future)
+
+    def collapse_ratio(self):
+        return self.stats["collapsed"] / self.stats["calls"] if self.stats["calls"] else 0.0
+
+
+if USE_LOCAL_STAND_IN:
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    class SlowFakeChatModel(FakeListChatModel):
+        """Fake chat model that takes `sleep` seconds per call, like an API round-trip."""
+
+        def _call(self, *args, **kwargs):
+            time.sleep(self.sleep or 0)
+            return super()._call(*args, **kwargs)
+
+    model = SlowFakeChatModel(responses=["Why did the lawyer cross the road? To sue the chicken."],
+                              sleep=STAND_IN_LATENCY_SECONDS)
+else:
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI(model=GPT_4O_MODEL_STR)
+
+# Chain from 01_chains_basics.py
+prompt_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", "You are a comedian who tells jokes about {topic}."),
+        ("human", "Tell me {joke_count} jokes."),
+    ]
+)
+chain = prompt_template | model | StrOutputParser()
+
+# A traffic spike: many callers, only a handful of distinct inputs
+inputs = [{"topic": DISTINCT_TOPICS[i % len(DISTINCT_TOPICS)], "joke_count": 3} for i in range(CONCURRENT_CALLERS)]
+
+
+def report(label, runnable, seconds):
+    print("{:<12} {:>3} calls, {:>3} executions, {:>3} collapsed ({:.0%}) in {:.2f}s".format(
+        label, runnable.stats["calls"], runnable.stats["executions"], runnable.stats["collapsed"],
+        runnable.collapse_ratio(), seconds))
+
+
+print("\n--- Threads ---")
+coalesced_chain = SingleflightRunnable(chain)
+start = time.perf_counter()
+with ThreadPoolExecutor(max_workers=CONCURRENT_CALLERS) as executor:
+    results = list(executor.map(coalesced_chain.invoke, inputs))
+report("sync", coalesced_chain, time.perf_counter() - start)
+print(results[0])
+
+
+async def run_async():
+    return await asyncio.gather(*(coalesced_chain.ainvoke(variables) for variables in inputs))
+
+
+print("\n--- asyncio ---")
+coalesced_chain = SingleflightRunnable(chain)
+start = time.perf_counter()
+results = asyncio.run(run_async())
+report("async", coalesced_chain, time.perf_counter() - start)
+print(results[0])
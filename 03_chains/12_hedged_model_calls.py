@@ -0,0 +1,354 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, List, Optional
+
+from dotenv import load_dotenv
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+
+load_dotenv()
+
+# Constants
+GPT_4O_MODEL_STR = "gpt-4o"
+DEADLINE_SECONDS = 3.0  # Per model call, including any hedge
+HEDGE_PERCENTILE = 0.95  # Fire a duplicate request once a call is slower than this percentile
+HEDGE_BUDGET = 0.10  # At most this fraction of calls may be hedged, so a slow provider is not doubled
+DEFAULT_HEDGE_DELAY_SECONDS = 1.0  # Until MIN_LATENCY_SAMPLES latencies have been seen
+MIN_LATENCY_SAMPLES = 20
+LATENCY_WINDOW = 1000
+FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+BREAKER_RESET_SECONDS = 30.0  # How long an open circuit fails fast before letting a probe through
+HEDGE_WORKERS = 32  # Threads for the sync invoke path
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+BENCHMARK_CALLS = 300
+BENCHMARK_CONCURRENCY = 30
+
+# Set to False to benchmark against the OpenAI API (requires OPENAI_API_KEY)
+USE_LOCAL_STAND_IN = True
+STAND_IN_MEDIAN_LATENCY_SECONDS = 0.1
+STAND_IN_TAIL_PROBABILITY = 0.05  # Share of calls that hit the heavy (Pareto) tail
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after FAILURE_THRESHOLD consecutive failures and fails fast until a probe succeeds."""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+            if self.state == OPEN or (self.state == HALF_OPEN and self.probe_in_flight):
+                raise CircuitOpenError("Circuit open after {} consecutive failures".format(self.failures))
+            if self.state == HALF_OPEN:
+                self.probe_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state, self.failures, self.probe_in_flight = CLOSED, 0, False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state, self.opened_at, self.probe_in_flight = OPEN, time.monotonic(), False
+
+    def record_no_outcome(self):
+        """The call was cancelled or interrupted: free the probe slot without judging the provider."""
+        with self._lock:
+            self.probe_in_flight = False
+
+
+class ResilientRunnable(Runnable):
+    """Wraps a model (or any Runnable) with a deadline, hedged requests and a circuit breaker.
+
+    A call that has not finished after the HEDGE_PERCENTILE latency of recent attempts gets
+    one duplicate request; whichever answers first wins and the other is cancelled (the sync
+    path can only abandon it, as threads cannot be cancelled). The whole call, hedge
+    included, must finish within `deadline` seconds or DeadlineExceeded is raised. Failures
+    and timeouts feed the circuit breaker, which raises CircuitOpenError without calling
+    the provider while it is open; a cancelled call counts as neither success nor failure.
+    """
+
+    def __init__(self, runnable, deadline=DEADLINE_SECONDS, hedge_percentile=HEDGE_PERCENTILE,
+                 hedge_budget=HEDGE_BUDGET, breaker=None):
+        self.runnable = runnable
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.breaker = breaker or CircuitBreaker()
+        self.attempt_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "timeouts": 0, "failures": 0, "rejected": 0}
+        self._executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS)  # Starts its threads on demand
+
+    def hedge_delay(self):
+        if len(self.attempt_latencies) < MIN_LATENCY_SAMPLES:
+            return DEFAULT_HEDGE_DELAY_SECONDS
+        latencies = sorted(self.attempt_latencies)
+        return latencies[int(self.hedge_percentile * (len(latencies) - 1))]
+
+    def _may_hedge(self):
+        return self.stats["hedged"] < self.hedge_budget * self.stats["calls"]
+
+    def _start_call(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.stats["rejected"] += 1
+            raise
+        self.stats["calls"] += 1
+
+    def _finish_call(self, succeeded, error):
+        if succeeded:
+            self.breaker.record_success()
+        elif error is None:  # Cancelled, or a BaseException such as KeyboardInterrupt
+            self.breaker.record_no_outcome()
+        else:
+            self.breaker.record_failure()
+            self.stats["timeouts" if isinstance(error, DeadlineExceeded) else "failures"] += 1
+
+    def close(self):
+        """Shut down the sync path's thread pool; abandoned attempts are not waited for."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- async ---
+
+    async def _attempt(self, input, config, kwargs):
+        start = time.perf_counter()
+        try:
+            result = await self.runnable.ainvoke(input, config, **kwargs)
+        except asyncio.CancelledError:
+            # A cancelled attempt (the hedge race loser or a deadline hit) was at least this slow.
+            # Dropping it would bias the hedge delay percentile towards the fast calls.
+            self.attempt_latencies.append(time.perf_counter() - start)
+            raise
+        self.attempt_latencies.append(time.perf_counter() - start)
+        return result
+
+    async def _ahedged(self, input, config, kwargs):
+        tasks = [asyncio.ensure_future(self._attempt(input, config, kwargs))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay())
+            if done or not self._may_hedge():
+                return await tasks[0]
+            self.stats["hedged"] += 1
+            tasks.append(asyncio.ensure_future(self._attempt(input, config, kwargs)))
+            error = None
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.stats["hedge_wins"] += task is tasks[1]
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _within_deadline(self, input, config, kwargs):
+        # Not wait_for: its TimeoutError could not be told apart from one raised by the model
+        task = asyncio.ensure_future(self._ahedged(input, config, kwargs))
+        try:
+            done, _ = await asyncio.wait([task], timeout=self.deadline)
+        finally:
+            task.cancel()  # No-op once done; otherwise the deadline passed or the caller was cancelled
+        if not done:
+            raise DeadlineExceeded("Model call exceeded its {}s deadline".format(self.deadline))
+        return task.result()
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        self._start_call()
+        succeeded, error = False, None
+        try:
+            result = await self._within_deadline(input, config, kwargs)
+            succeeded = True
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._finish_call(succeeded, error)
+
+    # --- sync ---
+
+    def _sync_attempt(self, input, config, kwargs):
+        start = time.perf_counter()
+        result = self.runnable.invoke(input, config, **kwargs)
+        # Abandoned attempts still run to completion, so slow ones are recorded too
+        self.attempt_latencies.append(time.perf_counter() - start)
+        return result
+
+    def _hedged(self, input, config, kwargs):
+        deadline = time.monotonic() + self.deadline
+        futures = [self._executor.submit(self._sync_attempt, input, config, kwargs)]
+        done, _ = wait(futures, timeout=min(self.hedge_delay(), self.deadline))
+        if not done and self._may_hedge():
+            self.stats["hedged"] += 1
+            futures.append(self._executor.submit(self._sync_attempt, input, config, kwargs))
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    self.stats["hedge_wins"] += future is not futures[0]
+                    for other in pending:
+                        other.cancel()  # Only stops attempts that have not started; running ones are abandoned
+                    return future.result()
+                error = future.exception()
+        if pending:
+            raise DeadlineExceeded("Model call exceeded its {}s deadline".format(self.deadline))
+        raise error
+
+    def invoke(self, input, config=None, **kwargs):
+        self._start_call()
+        succeeded, error = False, None
+        try:
+            result = self._hedged(input, config, kwargs)
+            succeeded = True
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._finish_call(succeeded, error)
+
+
+class HeavyTailChatModel(BaseChatModel):
+    """Local stand-in: mostly fast, but a few calls hit a Pareto tail several seconds long."""
+
+    median_latency: float = STAND_IN_MEDIAN_LATENCY_SECONDS
+    tail_probability: float = STAND_IN_TAIL_PROBABILITY
+    failure_rate: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "heavy-tail-stand-in"
+
+    def _latency(self):
+        latency = random.lognormvariate(0, 0.25) * self.median_latency
+        if random.random() < self.tail_probability:
+            latency *= 10 * random.paretovariate(1.5)
+        return latency
+
+    def _result(self):
+        if random.random() < self.failure_rate:
+            raise ConnectionError("Stand-in provider is degraded")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Why did the lawyer cross the road?"))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._latency())
+        return self._result()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self._latency())
+        return self._result()
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {name: latencies[int(q * (len(latencies) - 1))] for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+
+
+async def benchmark(chain, calls=BENCHMARK_CALLS, concurrency=BENCHMARK_CONCURRENCY):
+    slots = asyncio.Semaphore(concurrency)
+    latencies, errors = [], []
+
+    async def one_call(i):
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await chain.ainvoke({"topic": "lawyers", "joke_count": 1 + i % 3})
+            except Exception as e:
+                errors.append(e)
+                return
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one_call(i) for i in range(calls)))
+    return latencies, errors
+
+
+def print_percentiles(label, latencies, errors):
+    print("{:<10} p50 {p50:.3f}s | p95 {p95:.3f}s | p99 {p99:.3f}s | {errors} errors".format(
+        label, errors=len(errors), **percentiles(latencies)))
+
+
+if USE_LOCAL_STAND_IN:
+    model = HeavyTailChatModel()
+else:
+    from langchain_openai import ChatOpenAI
+
+    model = ChatOpenAI(model=GPT_4O_MODEL_STR)
+
+prompt_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", "You are a comedian who tells jokes about {topic}."),
+        ("human", "Tell me {joke_count} jokes."),
+    ]
+)
+resilient_model = ResilientRunnable(model)
+
+chain = prompt_template | model | StrOutputParser()
+resilient_chain = prompt_template | resilient_model | StrOutputParser()
+
+print("\n--- Latency over {} calls ({} concurrent) ---".format(BENCHMARK_CALLS, BENCHMARK_CONCURRENCY))
+print_percentiles("Plain", *asyncio.run(benchmark(chain)))
+print_percentiles("Resilient", *asyncio.run(benchmark(resilient_chain)))
+print("Hedge delay now {:.3f}s; {}".format(resilient_model.hedge_delay(), resilient_model.stats))
+
+print("\n--- Sync invoke ---")
+start = time.perf_counter()
+print(resilient_chain.invoke({"topic": "lawyers", "joke_count": 3}))
+print("Took {:.3f}s".format(time.perf_counter() - start))
+resilient_model.close()
+
+if USE_LOCAL_STAND_IN:
+    print("\n--- Circuit breaker against a degraded provider ---")
+    degraded = ResilientRunnable(HeavyTailChatModel(failure_rate=1.0), breaker=CircuitBreaker(reset_seconds=1.0))
+    degraded_chain = prompt_template | degraded | StrOutputParser()
+    for i in range(8):
+        start = time.perf_counter()
+        try:
+            degraded_chain.invoke({"topic": "lawyers", "joke_count": 1})
+        except Exception as e:
+            print("Call {}: {} after {:.3f}s (breaker {})".format(
+                i, type(e).__name__, time.perf_counter() - start, degraded.breaker.state))
+
+    time.sleep(1.0)
+    degraded.runnable = HeavyTailChatModel()  # The provider recovers
+    degraded_chain.invoke({"topic": "lawyers", "joke_count": 1})
+    print("Probe after reset succeeded, breaker {}".format(degraded.breaker.state))
+    degraded.close()
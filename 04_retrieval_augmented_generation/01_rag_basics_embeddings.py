@@ -1,10 +1,5 @@
 import os
 
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.document_loaders import TextLoader
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
-
 # Constants
 BOOKS_DIR = "books"
 ODYSSEY_BOOK = "odyssey.txt"
@@ -18,6 +13,11 @@ persistent_dir = os.path.join(current_dir, DB_STR, CHROMA_DB_STR)
 
 if not os.path.exists(persistent_dir):
     print("Persistent directory does not exist. Initializing vector store...")
+    # Only the ingestion path needs these; a re-run with an existing store skips their import cost
+    from langchain.text_splitter import CharacterTextSplitter
+    from langchain_community.document_loaders import TextLoader
+    from langchain_community.vectorstores import Chroma
+    from langchain_openai import OpenAIEmbeddings
 
     if not os.path.exists(file_path):
         raise FileNotFoundError(
@@ -35,11 +35,15 @@ documents = loader.load()
 
 embeddings = OpenAIEmbeddings(model=TEXT_EMBEDDING_3_SMALL,)
 
+# Open vector stores by name, so querying reuses them instead of opening a new client per call
+vector_stores = {}
+
+
 def create_vector_store(docs, store_name):
     persistent_dir = os.path.join(db_dir, store_name)
     if not os.path.exists(persistent_dir):
         print("\n--- Creating vector store {} ---".format(store_name))
-        db = Chroma.from_documents(
+        vector_stores[store_name] = Chroma.from_documents(
             documents=docs, embedding=embeddings, persist_directory=persistent_dir)
         print("--- Finished creating vector store {} ---".format(store_name))
     else:
@@ -97,7 +101,9 @@ def query_vector_store(store_name, query):
     persistent_dir = os.path.join(db_dir, store_name)
     if os.path.exists(persistent_dir):
         print("\n--- Querying the Vector Store {} ---".format(store_name))
-        db = Chroma(persist_directory=persistent_dir, embedding_function=embeddings,)
+        if store_name not in vector_stores:
+            vector_stores[store_name] = Chroma(persist_directory=persistent_dir, embedding_function=embeddings,)
+        db = vector_stores[store_name]
         retriever = db.as_retriever(
             search_type="similarity_score_threshold",
             search_kwargs={"k": 1, "score_threshold": 0.1},
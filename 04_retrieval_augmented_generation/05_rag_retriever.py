@@ -21,12 +21,19 @@ persistent_dir = os.path.join(db_dir, CHROMA_DB_WITH_METADATA_STR)
 embeddings = OpenAIEmbeddings(model=TEXT_EMBEDDING_3_SMALL)
 db = Chroma(persist_directory=persistent_dir, embedding_function=embeddings)
 
+# Open vector stores by name and embedding, so querying reuses them instead of opening a new
+# client per call. The store keeps its embedding alive, so the id() in the key stays unique.
+vector_stores = {(CHROMA_DB_WITH_METADATA_STR, id(embeddings)): db}
+
 
 def query_vector_store(store_name, query, embedding_func, search_type, search_kwargs):
     """Function to query a vector store with different search types and parameters"""
     if os.path.exists(persistent_dir):
         print("\n--- Querying the Vector Store {} ---".format(store_name))
-        db = Chroma(persist_directory=persistent_dir, embedding_function=embedding_func)
+        key = (store_name, id(embedding_func))
+        if key not in vector_stores:
+            vector_stores[key] = Chroma(persist_directory=persistent_dir, embedding_function=embedding_func)
+        db = vector_stores[key]
 
         retriever = db.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
         relevant_docs = retriever.invoke(query)
@@ -1,10 +1,11 @@
 import os
+import time
 
 from dotenv import load_dotenv
 from langchain.chains import create_history_aware_retriever, create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_community.vectorstores import Chroma
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
@@ -16,6 +17,7 @@ CHROMA_DB_WITH_METADATA_STR = "chroma_db_with_metadata"
 TEXT_EMBEDDING_3_SMALL = "text-embedding-3-small"
 SIMILARITY_SEARCH_TYPE_STR = "similarity"
 GPT_4_MODEL_STR = "gpt-4o"
+STREAM_OUTPUT = True  # Set to False to wait for the full answer (rag_chain.invoke)
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 persistent_directory = os.path.join(current_dir, DB_STR, CHROMA_DB_WITH_METADATA_STR)
@@ -89,6 +91,34 @@ question_answer_chain = create_stuff_documents_chain(llm, qa_prompt)
 rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
 
 
+def get_answer(query, chat_history):
+    """Print the answer (token by token when streaming) and return it with its timings."""
+    start = time.perf_counter()
+    if not STREAM_OUTPUT:
+        answer = rag_chain.invoke({"input": query, "chat_history": chat_history})["answer"]
+        total_time = time.perf_counter() - start
+        print("AI: {}".format(answer))
+        return answer, total_time, total_time
+
+    # rag_chain.stream yields partial dicts; only the "answer" key carries generated tokens
+    first_token_time = None
+    answer = ""
+    print("AI: ", end="", flush=True)
+    for chunk in rag_chain.stream({"input": query, "chat_history": chat_history}):
+        token = chunk.get("answer")
+        if not token:
+            continue
+        if first_token_time is None:
+            first_token_time = time.perf_counter() - start
+        print(token, end="", flush=True)
+        answer += token
+    print()
+    total_time = time.perf_counter() - start
+    if first_token_time is None:
+        first_token_time = total_time
+    return answer, first_token_time, total_time
+
+
 # Function to simulate a continual chat
 def continual_chat():
     print("Start chatting with the AI! Type 'exit' to end the conversation.")
@@ -97,13 +127,12 @@ def continual_chat():
         query = input("You: ")
         if query.lower() == "exit":
             break
-        # Process the user's query through the retrieval chain
-        result = rag_chain.invoke({"input": query, "chat_history": chat_history})
-        # Display the AI's response
-        print(f"AI: {result['answer']}")
+        # Process the user's query through the retrieval chain and display the AI's response
+        answer, first_token_time, total_time = get_answer(query, chat_history)
+        print("(time to first token: {:.2f}s, total: {:.2f}s)".format(first_token_time, total_time))
         # Update the chat history
         chat_history.append(HumanMessage(content=query))
-        chat_history.append(SystemMessage(content=result["answer"]))
+        chat_history.append(AIMessage(content=answer))
 
 
 # Main function to start the continual chat
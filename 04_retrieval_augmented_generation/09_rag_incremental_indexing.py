@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import time
+
+from langchain.text_splitter import CharacterTextSplitter
+from langchain_community.document_loaders import TextLoader
+from langchain_community.vectorstores import Chroma
+from langchain_openai import OpenAIEmbeddings
+
+# Constants
+BOOKS_DIR_STR = "books"
+DB_STR = "db"
+CHROMA_DB_INCREMENTAL_STR = "chroma_db_incremental"
+MANIFEST_FILE_STR = "index_manifest.json"
+TEXT_EMBEDDING_3_SMALL = "text-embedding-3-small"
+HASH_BLOCK_SIZE = 1 << 20
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+books_dir = os.path.join(current_dir, BOOKS_DIR_STR)
+db_dir = os.path.join(current_dir, DB_STR)
+# A new store: the existing ones were built with random ids, which the manifest cannot track
+persistent_dir = os.path.join(db_dir, CHROMA_DB_INCREMENTAL_STR)
+manifest_path = os.path.join(persistent_dir, MANIFEST_FILE_STR)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(source, texts):
+    """Content-addressed ids, so a chunk keeps its id when text elsewhere in the file changes.
+
+    Repeated identical chunks within one file get an occurrence suffix to stay unique.
+    """
+    seen = {}
+    ids = []
+    for text in texts:
+        chunk_hash = hashlib.sha256("{}\0{}".format(source, text).encode("utf-8")).hexdigest()
+        occurrence = seen.get(chunk_hash, 0)
+        seen[chunk_hash] = occurrence + 1
+        ids.append(chunk_hash if occurrence == 0 else "{}-{}".format(chunk_hash, occurrence))
+    return ids
+
+
+class IncrementalIndexer:
+    """Keeps a vector store in sync with a set of files, re-embedding only what changed.
+
+    The manifest records, per file, the file's content hash and the ids of its chunks. Files
+    whose hash is unchanged are skipped without being read. Changed files are split again and
+    only chunks with new ids are embedded and upserted; ids no longer produced are deleted, as
+    are all chunks of files that have disappeared. The manifest is saved after every file, once
+    the store has been updated, so an interrupted run picks up where it stopped.
+    """
+
+    def __init__(self, vector_store, manifest_path, text_splitter):
+        self.vector_store = vector_store
+        self.manifest_path = manifest_path
+        self.text_splitter = text_splitter
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {"files": {}}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_manifest(self):
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        temporary_path = self.manifest_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(temporary_path, self.manifest_path)
+
+    def _index_file(self, source, path, content_hash, stats):
+        documents = TextLoader(path).load()
+        chunks = self.text_splitter.split_documents(documents)
+        texts = [chunk.page_content for chunk in chunks]
+        ids = chunk_ids(source, texts)
+
+        old_ids = set(self.manifest["files"].get(source, {}).get("chunks", []))
+        new_positions = [i for i, chunk_id in enumerate(ids) if chunk_id not in old_ids]
+        stale_ids = list(old_ids - set(ids))
+
+        if new_positions:
+            self.vector_store.add_texts(
+                [texts[i] for i in new_positions],
+                metadatas=[{"source": source, "chunk_id": ids[i]} for i in new_positions],
+                ids=[ids[i] for i in new_positions],
+            )
+        if stale_ids:
+            self.vector_store.delete(ids=stale_ids)
+
+        self.manifest["files"][source] = {"file_hash": content_hash, "chunks": ids}
+        self._save_manifest()
+        stats["chunks_added"] += len(new_positions)
+        stats["chunks_deleted"] += len(stale_ids)
+        stats["chunks_kept"] += len(ids) - len(new_positions)
+
+    def index(self, paths):
+        """Index the given files (source name -> path); files missing from `paths` are removed."""
+        start = time.perf_counter()
+        stats = {"files_unchanged": 0, "files_indexed": 0, "files_removed": 0,
+                 "chunks_added": 0, "chunks_deleted": 0, "chunks_kept": 0}
+        for source, path in sorted(paths.items()):
+            content_hash = file_hash(path)
+            entry = self.manifest["files"].get(source)
+            if entry is not None and entry["file_hash"] == content_hash:
+                stats["files_unchanged"] += 1
+                stats["chunks_kept"] += len(entry["chunks"])
+                continue
+            self._index_file(source, path, content_hash, stats)
+            stats["files_indexed"] += 1
+
+        for source in sorted(set(self.manifest["files"]) - set(paths)):
+            stale_ids = self.manifest["files"].pop(source)["chunks"]
+            if stale_ids:
+                self.vector_store.delete(ids=stale_ids)
+            self._save_manifest()
+            stats["files_removed"] += 1
+            stats["chunks_deleted"] += len(stale_ids)
+
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+
+if not os.path.exists(books_dir):
+    raise FileNotFoundError("The directory {} does not exist. Please check the path.".format(books_dir))
+
+book_paths = {f: os.path.join(books_dir, f) for f in os.listdir(books_dir) if f.endswith(".txt")}
+
+embeddings = OpenAIEmbeddings(model=TEXT_EMBEDDING_3_SMALL)
+db = Chroma(persist_directory=persistent_dir, embedding_function=embeddings)
+text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
+indexer = IncrementalIndexer(db, manifest_path, text_splitter)
+
+print("\n--- Indexing {} ---".format(", ".join(sorted(book_paths))))
+print(indexer.index(book_paths))
+
+# Nothing changed since the run above: every file is skipped on its hash, no embedding calls
+print("\n--- Re-indexing unchanged books ---")
+print(indexer.index(book_paths))
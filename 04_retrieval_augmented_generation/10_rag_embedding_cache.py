@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain.text_splitter import CharacterTextSplitter, RecursiveCharacterTextSplitter, TextSplitter
+from langchain_community.document_loaders import TextLoader
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+# Constants
+BOOKS_DIR_STR = "books"
+ROMEO_AND_JULIET_BOOK_STR = "romeo_and_juliet.txt"
+CACHE_DIR_STR = "cache"
+EMBEDDING_CACHE_DB_STR = "embedding_cache.sqlite3"
+TEXT_EMBEDDING_3_SMALL = "text-embedding-3-small"
+QUERY_NAMESPACE_STR = "query"
+# Settings that change the vectors a model returns, e.g. normalize_embeddings in encode_kwargs
+EMBEDDING_SETTINGS_FIELDS = ("model_kwargs", "encode_kwargs", "query_encode_kwargs",
+                             "embed_instruction", "query_instruction")
+SQLITE_MAX_VARIABLES = 900  # Stay below SQLite's limit of bound parameters per statement
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+file_path = os.path.join(current_dir, BOOKS_DIR_STR, ROMEO_AND_JULIET_BOOK_STR)
+cache_path = os.path.join(current_dir, CACHE_DIR_STR, EMBEDDING_CACHE_DB_STR)
+
+
+def model_id(embeddings):
+    """Identify the embedding model and its settings, e.g. "OpenAIEmbeddings:text-embedding-3-small".
+
+    Non-empty EMBEDDING_SETTINGS_FIELDS add a hash of their JSON, so the same model with and
+    without normalisation gets separate cache rows.
+    """
+    name = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None) or ""
+    dimensions = getattr(embeddings, "dimensions", None)
+    suffix = ":{}d".format(dimensions) if dimensions else ""
+    settings = {field: getattr(embeddings, field) for field in EMBEDDING_SETTINGS_FIELDS
+                if getattr(embeddings, field, None)}
+    if settings:
+        settings_json = json.dumps(settings, sort_keys=True, default=repr)
+        suffix += ":{}".format(hashlib.sha256(settings_json.encode("utf-8")).hexdigest()[:16])
+    return "{}:{}{}".format(type(embeddings).__name__, name, suffix)
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PersistentEmbeddingCache:
+    """SQLite table of float32 vectors keyed by (model, SHA-256 of the text).
+
+    Vectors are stored as raw float32 bytes: 6 KiB for a 1536-dimensional OpenAI embedding,
+    against roughly 30 KiB as JSON text.
+    """
+
+    def __init__(self, database_path):
+        os.makedirs(os.path.dirname(database_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(database_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, PRIMARY KEY (model, text_hash))"
+        )
+        self._connection.commit()
+
+    def get_many(self, model, hashes):
+        found = {}
+        with self._lock:
+            for start in range(0, len(hashes), SQLITE_MAX_VARIABLES):
+                batch = hashes[start:start + SQLITE_MAX_VARIABLES]
+                rows = self._connection.execute(
+                    "SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({})".format(
+                        ", ".join("?" * len(batch))),
+                    [model, *batch],
+                ).fetchall()
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+        return found
+
+    def put_many(self, model, items):
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model, key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items],
+            )
+            self._connection.commit()
+
+    def size(self):
+        with self._lock:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends texts it has not embedded before to the wrapped model.
+
+    Works with any LangChain Embeddings (OpenAIEmbeddings, HuggingFaceEmbeddings, ...) and can
+    be passed wherever they are, e.g. Chroma.from_documents(docs, embedding=cached_embeddings).
+    Identical texts within one batch are embedded once. Queries are cached separately from
+    documents, as some models embed the two differently. Pass `namespace` to key the cache
+    explicitly when model_id cannot see a setting that changes the vectors.
+    """
+
+    def __init__(self, embeddings, cache, namespace=None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = namespace or model_id(embeddings)
+        self.stats = {"texts": 0, "batch_duplicates": 0, "hits": 0, "misses": 0, "embedding_calls": 0}
+
+    def embed_documents(self, texts):
+        unique_texts = list(dict.fromkeys(texts))
+        self.stats["texts"] += len(texts)
+        self.stats["batch_duplicates"] += len(texts) - len(unique_texts)
+
+        hashes = {text: text_hash(text) for text in unique_texts}
+        vectors = self.cache.get_many(self.model, list(set(hashes.values())))
+        missing = [text for text in unique_texts if hashes[text] not in vectors]
+        self.stats["hits"] += len(unique_texts) - len(missing)
+        self.stats["misses"] += len(missing)
+
+        if missing:
+            self.stats["embedding_calls"] += 1
+            new_vectors = self.embeddings.embed_documents(missing)
+            items = [(hashes[text], vector) for text, vector in zip(missing, new_vectors)]
+            self.cache.put_many(self.model, items)
+            vectors.update((key, np.asarray(vector, dtype=np.float32)) for key, vector in items)
+
+        return [vectors[hashes[text]].tolist() for text in texts]
+
+    def embed_query(self, text):
+        namespace = "{}:{}".format(self.model, QUERY_NAMESPACE_STR)
+        key = text_hash(text)
+        vector = self.cache.get_many(namespace, [key]).get(key)
+        if vector is None:
+            self.stats["misses"] += 1
+            self.stats["embedding_calls"] += 1
+            vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+            self.cache.put_many(namespace, [(key, vector)])
+        else:
+            self.stats["hits"] += 1
+        return vector.tolist()
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+
+class CustomTextSplitter(TextSplitter):
+    def split_text(self, text):
+        return text.split("\n\n")  # Splitting by paragraphs, as in 03_rag_text_splitting.py
+
+
+if not os.path.exists(file_path):
+    raise FileNotFoundError("The file {} does not exist. Please check the path".format(file_path))
+
+documents = TextLoader(file_path=file_path).load()
+cache = PersistentEmbeddingCache(cache_path)
+cached_embeddings = CachedEmbeddings(OpenAIEmbeddings(model=TEXT_EMBEDDING_3_SMALL), cache)
+
+# Splitters from 03_rag_text_splitting.py that share many identical chunks
+splitters = {
+    "character": CharacterTextSplitter(chunk_size=1000, chunk_overlap=100),
+    "recursive_character": RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100),
+    "custom": CustomTextSplitter(),
+}
+
+# The second pass is what every re-run of the ingestion scripts looks like
+for run in ("First ingestion", "Repeat ingestion"):
+    print("\n--- {} ---".format(run))
+    for name, splitter in splitters.items():
+        texts = [doc.page_content for doc in splitter.split_documents(documents)]
+        hits_before, misses_before = cached_embeddings.stats["hits"], cached_embeddings.stats["misses"]
+        start = time.perf_counter()
+        cached_embeddings.embed_documents(texts)
+        print("{:<20} {:>5} chunks: {:>5} cached, {:>5} embedded in {:.2f}s".format(
+            name, len(texts), cached_embeddings.stats["hits"] - hits_before,
+            cached_embeddings.stats["misses"] - misses_before, time.perf_counter() - start))
+
+print("\n--- Embedding cache ---")
+print("{} | hit rate {:.1%} | {} vectors on disk".format(cached_embeddings.stats, cached_embeddings.hit_rate(), cache.size()))
@@ -0,0 +1,295 @@
+import hashlib
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+import tiktoken
+from langchain.text_splitter import CharacterTextSplitter
+from langchain_community.document_loaders import TextLoader
+from langchain_core.embeddings import Embeddings
+
+# Constants
+BOOKS_DIR_STR = "books"
+DB_STR = "db"
+CHROMA_DB_PIPELINED_STR = "chroma_db_pipelined"
+TEXT_EMBEDDING_3_SMALL = "text-embedding-3-small"
+EMBEDDING_ENCODING_STR = "cl100k_base"  # Tokenizer of the OpenAI embedding models
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 0
+# The provider accepts up to 2048 inputs and 300k tokens per embeddings request; smaller
+# batches keep several requests in flight instead of one huge one
+MAX_BATCH_TOKENS = 20_000
+MAX_BATCH_INPUTS = 2048
+SEQUENTIAL_BATCH_INPUTS = 1000  # OpenAIEmbeddings' default chunk_size, used by the baseline
+EMBEDDING_WORKERS = 4  # Concurrent embedding requests
+SPLIT_PROCESSES = os.cpu_count() or 1
+WRITE_BATCH_SIZE = 500  # Rows per vector store write
+QUEUE_SIZE = 8  # Bounded queues: a slow stage applies back-pressure instead of buffering everything
+SENTINEL = None
+
+# Set to False to embed with OpenAI and write to Chroma (requires OPENAI_API_KEY)
+USE_LOCAL_STAND_IN = True
+STAND_IN_REQUEST_SECONDS = 0.1
+STAND_IN_SECONDS_PER_1K_TOKENS = 0.02
+STAND_IN_DIMENSIONS = 1536
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+books_dir = os.path.join(current_dir, BOOKS_DIR_STR)
+persistent_dir = os.path.join(current_dir, DB_STR, CHROMA_DB_PIPELINED_STR)
+
+
+@lru_cache(maxsize=None)
+def get_encoding():
+    return tiktoken.get_encoding(EMBEDDING_ENCODING_STR)
+
+
+def chunk_ids(source, texts):
+    """Ids derived from the file and chunk text, so re-ingesting a file upserts the same rows."""
+    occurrences = Counter()  # Identical chunks in one file are told apart by their occurrence
+    ids = []
+    for text in texts:
+        digest = hashlib.sha256("{}\0{}".format(source, text).encode("utf-8")).hexdigest()
+        ids.append("{}-{}".format(digest, occurrences[digest]))
+        occurrences[digest] += 1
+    return ids
+
+
+def split_file(path):
+    """Load and split one file into (id, text, metadata, tokens) chunks; runs in a worker process."""
+    source = os.path.basename(path)
+    documents = TextLoader(path).load()
+    for document in documents:
+        document.metadata = {"source": source}
+    splitter = CharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    encoding = get_encoding()
+    chunks = splitter.split_documents(documents)
+    ids = chunk_ids(source, [chunk.page_content for chunk in chunks])
+    return [(chunk_id, chunk.page_content, chunk.metadata, len(encoding.encode(chunk.page_content)))
+            for chunk_id, chunk in zip(ids, chunks)]
+
+
+def timed_split_file(path):
+    start = time.perf_counter()
+    chunks = split_file(path)
+    return chunks, time.perf_counter() - start
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def record(self, items, start, end):
+        with self._lock:
+            self.items += items
+            self.busy_seconds += end - start
+            self.first_start = start if self.first_start is None else min(self.first_start, start)
+            self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+    def report(self):
+        active = (self.last_end - self.first_start) if self.items else 0.0
+        return "{:<8} {:>6} chunks | {:>9.1f} chunks/s over {:.2f}s active | {:.2f}s busy".format(
+            self.name, self.items, self.items / active if active else 0.0, active, self.busy_seconds)
+
+
+class PipelinedIngestion:
+    """Load/split, embed and write stages running concurrently, joined by bounded queues.
+
+    Files are split in a process pool (splitting is CPU-bound and holds the GIL). Chunks are
+    grouped into batches capped by token count and input count, EMBEDDING_WORKERS threads
+    embed batches concurrently, and one writer thread stores them in WRITE_BATCH_SIZE rows.
+    `write_batch(ids, texts, metadatas, vectors)` is the storage step, e.g. chroma_writer(db).
+    """
+
+    def __init__(self, embeddings, write_batch, embedding_workers=EMBEDDING_WORKERS,
+                 split_processes=SPLIT_PROCESSES, max_batch_tokens=MAX_BATCH_TOKENS,
+                 max_batch_inputs=MAX_BATCH_INPUTS, write_batch_size=WRITE_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.write_batch = write_batch
+        self.embedding_workers = embedding_workers
+        self.split_processes = split_processes
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_inputs = max_batch_inputs
+        self.write_batch_size = write_batch_size
+        self.chunk_queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.batch_queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.write_queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.stages = {name: StageStats(name) for name in ("split", "embed", "write")}
+        self.errors = []
+
+    def _split_stage(self, paths):
+        if not paths:  # A process pool needs at least one worker
+            self.chunk_queue.put(SENTINEL)
+            return
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.split_processes, len(paths))) as executor:
+                futures = [executor.submit(timed_split_file, path) for path in paths]
+                for future in as_completed(futures):
+                    chunks, seconds = future.result()
+                    end = time.perf_counter()
+                    self.stages["split"].record(len(chunks), end - seconds, end)
+                    self.chunk_queue.put(chunks)
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            self.chunk_queue.put(SENTINEL)
+
+    def _batch_stage(self):
+        """Group chunks into batches that stay under the token and input limits of one request."""
+        batch, batch_tokens = [], 0
+        while True:
+            chunks = self.chunk_queue.get()
+            if chunks is SENTINEL:
+                break
+            for chunk in chunks:
+                tokens = chunk[3]
+                if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= self.max_batch_inputs):
+                    self.batch_queue.put(batch)
+                    batch, batch_tokens = [], 0
+                batch.append(chunk)
+                batch_tokens += tokens
+        if batch:
+            self.batch_queue.put(batch)
+        for _ in range(self.embedding_workers):
+            self.batch_queue.put(SENTINEL)
+
+    def _embed_stage(self):
+        while True:
+            batch = self.batch_queue.get()
+            if batch is SENTINEL:
+                break
+            if self.errors:
+                continue  # Keep draining so upstream stages never block on a full queue
+            try:
+                start = time.perf_counter()
+                vectors = self.embeddings.embed_documents([text for _, text, _, _ in batch])
+                self.stages["embed"].record(len(batch), start, time.perf_counter())
+                self.write_queue.put([(chunk_id, text, metadata, vector)
+                                      for (chunk_id, text, metadata, _), vector in zip(batch, vectors)])
+            except Exception as e:
+                self.errors.append(e)
+        self.write_queue.put(SENTINEL)
+
+    def _flush(self, rows):
+        start = time.perf_counter()
+        self.write_batch([chunk_id for chunk_id, _, _, _ in rows], [text for _, text, _, _ in rows],
+                         [metadata for _, _, metadata, _ in rows], [vector for _, _, _, vector in rows])
+        self.stages["write"].record(len(rows), start, time.perf_counter())
+
+    def _write_stage(self):
+        rows, finished_workers = [], 0
+        while finished_workers < self.embedding_workers:
+            embedded = self.write_queue.get()
+            if embedded is SENTINEL:
+                finished_workers += 1
+                continue
+            if self.errors:
+                continue
+            rows.extend(embedded)
+            try:
+                while len(rows) >= self.write_batch_size:
+                    self._flush(rows[:self.write_batch_size])
+                    rows = rows[self.write_batch_size:]
+            except Exception as e:
+                self.errors.append(e)
+        if rows and not self.errors:
+            try:
+                self._flush(rows)
+            except Exception as e:
+                self.errors.append(e)
+
+    def run(self, paths):
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._split_stage, args=(paths,)),
+                   threading.Thread(target=self._batch_stage),
+                   threading.Thread(target=self._write_stage)]
+        threads += [threading.Thread(target=self._embed_stage) for _ in range(self.embedding_workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.errors:
+            raise self.errors[0]
+        return time.perf_counter() - start
+
+    def report(self):
+        return "\n".join(stage.report() for stage in self.stages.values())
+
+
+def chroma_writer(db):
+    # LangChain's Chroma wrapper only adds texts it embeds itself, so precomputed vectors go to
+    # the underlying chromadb collection
+    def write_batch(ids, texts, metadatas, vectors):
+        db._collection.upsert(ids=ids, documents=texts, metadatas=metadatas, embeddings=vectors)
+    return write_batch
+
+
+class LatencyEmbeddings(Embeddings):
+    """Local stand-in: each request takes a fixed round-trip plus time per token."""
+
+    def embed_documents(self, texts):
+        tokens = sum(len(text) for text in texts) / 4
+        time.sleep(STAND_IN_REQUEST_SECONDS + tokens / 1000 * STAND_IN_SECONDS_PER_1K_TOKENS)
+        return [[random.random() for _ in range(8)] + [0.0] * (STAND_IN_DIMENSIONS - 8) for _ in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class InMemoryWriter:
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, ids, texts, metadatas, vectors):
+        self.rows += len(ids)
+
+
+def ingest_sequentially(paths, embeddings, write_batch):
+    """The order Chroma.from_documents works in: load and split everything, then embed, then write."""
+    start = time.perf_counter()
+    chunks = [chunk for path in paths for chunk in split_file(path)]
+    texts = [text for _, text, _, _ in chunks]
+    vectors = []
+    for i in range(0, len(texts), SEQUENTIAL_BATCH_INPUTS):
+        vectors.extend(embeddings.embed_documents(texts[i:i + SEQUENTIAL_BATCH_INPUTS]))
+    write_batch([chunk_id for chunk_id, _, _, _ in chunks], texts, [metadata for _, _, metadata, _ in chunks], vectors)
+    return time.perf_counter() - start, len(chunks)
+
+
+# The process pool re-imports this file in its workers on macOS/Windows, so the script body is guarded
+if __name__ == "__main__":
+    if not os.path.exists(books_dir):
+        raise FileNotFoundError("The directory {} does not exist. Please check the path.".format(books_dir))
+    book_paths = [os.path.join(books_dir, f) for f in sorted(os.listdir(books_dir)) if f.endswith(".txt")]
+
+    if USE_LOCAL_STAND_IN:
+        embeddings = LatencyEmbeddings()
+        writer = InMemoryWriter()
+    else:
+        from langchain_community.vectorstores import Chroma
+        from langchain_openai import OpenAIEmbeddings
+
+        # chunk_size lets one of our token-sized batches go out as a single request
+        embeddings = OpenAIEmbeddings(model=TEXT_EMBEDDING_3_SMALL, chunk_size=MAX_BATCH_INPUTS)
+        writer = chroma_writer(Chroma(persist_directory=persistent_dir, embedding_function=embeddings))
+
+    print("\n--- Pipelined ingestion of {} files ---".format(len(book_paths)))
+    pipeline = PipelinedIngestion(embeddings, writer)
+    seconds = pipeline.run(book_paths)
+    print(pipeline.report())
+    print("Total: {} chunks in {:.2f}s ({:.1f} chunks/s)".format(
+        pipeline.stages["write"].items, seconds, pipeline.stages["write"].items / seconds))
+
+    if USE_LOCAL_STAND_IN:
+        print("\n--- Sequential ingestion (baseline) ---")
+        seconds, chunk_count = ingest_sequentially(book_paths, embeddings, InMemoryWriter())
+        print("Total: {} chunks in {:.2f}s ({:.1f} chunks/s)".format(chunk_count, seconds, chunk_count / seconds))
@@ -0,0 +1,291 @@
+import os
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+
+from langchain.text_splitter import CharacterTextSplitter, RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import TextLoader
+from langchain_core.documents import Document
+
+# Constants
+BOOKS_DIR_STR = "books"
+ODYSSEY_BOOK_STR = "odyssey.txt"
+ROMEO_AND_JULIET_BOOK_STR = "romeo_and_juliet.txt"
+BLOCK_SIZE = 1 << 16  # Characters read per block; decoding buffers make each block cost several times this
+CORPUS_COPIES = [1, 4, 16]  # Odyssey copies per generated file in the memory benchmark
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+books_dir = os.path.join(current_dir, BOOKS_DIR_STR)
+
+
+def read_blocks(path, encoding=None, block_size=BLOCK_SIZE):
+    """Yield the file's text in blocks; newlines are translated exactly as TextLoader does."""
+    with open(path, encoding=encoding) as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def file_contains(path, separator, encoding=None, block_size=BLOCK_SIZE):
+    tail = ""
+    for block in read_blocks(path, encoding, block_size):
+        window = tail + block
+        if separator in window:
+            return True
+        tail = window[-(len(separator) - 1):] if len(separator) > 1 else ""
+    return False
+
+
+def stream_splits(blocks, separator, keep_separator):
+    """re.split-style splits on a literal separator over a stream of blocks.
+
+    Yields (text, start, end) with absolute character offsets, dropping empty splits like the
+    splitters do. Only the split being read is buffered, so memory is one block plus one split.
+    """
+    if not separator:
+        offset = 0
+        for block in blocks:
+            for char in block:
+                yield char, offset, offset + 1
+                offset += 1
+        return
+
+    buffer, buffer_offset = "", 0  # buffer_offset is the absolute offset of buffer[0]
+    split_start, search_from = 0, 0  # Indexes into buffer
+    for block in blocks:
+        buffer = buffer[split_start:] + block
+        buffer_offset += split_start
+        search_from -= split_start
+        split_start = 0
+        while True:
+            index = buffer.find(separator, search_from)
+            if index == -1:
+                break
+            match_end = index + len(separator)
+            if not keep_separator:
+                split_end, next_start = index, match_end
+            elif keep_separator == "end":
+                split_end, next_start = match_end, match_end
+            else:  # True or "start": the separator begins the next split
+                split_end, next_start = index, index
+            if split_end > split_start:
+                yield buffer[split_start:split_end], buffer_offset + split_start, buffer_offset + split_end
+            split_start, search_from = next_start, match_end
+        # A separator straddling the block boundary starts in the last len(separator) - 1 characters
+        search_from = max(search_from, len(buffer) - len(separator) + 1)
+    if len(buffer) > split_start:
+        yield buffer[split_start:], buffer_offset + split_start, buffer_offset + len(buffer)
+
+
+def find_splits(text, base, pattern, keep_separator):
+    """In-memory counterpart of stream_splits for a regex pattern, with offsets from `base`."""
+    if not pattern:
+        return [(char, base + i, base + i + 1) for i, char in enumerate(text)]
+    bounds, previous = [], 0
+    for match in re.finditer(pattern, text):
+        if not keep_separator:
+            bounds.append((previous, match.start()))
+            previous = match.end()
+        elif keep_separator == "end":
+            bounds.append((previous, match.end()))
+            previous = match.end()
+        else:
+            bounds.append((previous, match.start()))
+            previous = match.start()
+    bounds.append((previous, len(text)))
+    return [(text[start:end], base + start, base + end) for start, end in bounds if end > start]
+
+
+class SplitMerger:
+    """Incremental TextSplitter._merge_splits over splits that carry source offsets.
+
+    add() returns the chunks completed by a new split and finish() the last one. Each chunk is
+    (text, start, end), where start/end are the source offsets of its first and last character
+    after whitespace stripping. source[start:end] equals the chunk unless the splitter dropped
+    empty splits between repeated separators inside it.
+    """
+
+    def __init__(self, splitter, separator):
+        self.chunk_size = splitter._chunk_size
+        self.chunk_overlap = splitter._chunk_overlap
+        self.length_function = splitter._length_function
+        self.strip_whitespace = splitter._strip_whitespace
+        self.separator = separator
+        self.separator_len = self.length_function(separator)
+        self.current = deque()  # (text, start, end, length)
+        self.total = 0
+
+    def add(self, split):
+        text, start, end = split
+        length = self.length_function(text)
+        chunks = []
+        if self.total + length + (self.separator_len if self.current else 0) > self.chunk_size:
+            if self.current:
+                chunk = self._join()
+                if chunk is not None:
+                    chunks.append(chunk)
+                while self.total > self.chunk_overlap or (
+                        self.total + length + (self.separator_len if self.current else 0) > self.chunk_size
+                        and self.total > 0):
+                    self.total -= self.current.popleft()[3] + (self.separator_len if len(self.current) > 0 else 0)
+        self.current.append((text, start, end, length))
+        self.total += length + (self.separator_len if len(self.current) > 1 else 0)
+        return chunks
+
+    def finish(self):
+        chunk = self._join() if self.current else None
+        self.current.clear()
+        self.total = 0
+        return [chunk] if chunk is not None else []
+
+    def _source_offset(self, position):
+        """Map a position in the joined chunk back to the source text."""
+        cursor, separator_chars = 0, len(self.separator)
+        for index, (text, start, end, _) in enumerate(self.current):
+            if position < cursor + len(text):
+                return start + position - cursor
+            cursor += len(text)
+            if index < len(self.current) - 1:
+                if position < cursor + separator_chars:
+                    return end + position - cursor
+                cursor += separator_chars
+        return self.current[-1][2]
+
+    def _join(self):
+        joined = self.separator.join(part[0] for part in self.current)
+        lead = trail = 0
+        if self.strip_whitespace:
+            lead = len(joined) - len(joined.lstrip())
+            trail = len(joined) - len(joined.rstrip())
+        text = joined[lead:len(joined) - trail]
+        if text == "":
+            return None
+        return text, self._source_offset(lead), self._source_offset(len(joined) - trail - 1) + 1
+
+
+class StreamingTextSplitter:
+    """Streams chunks of a file identical to a CharacterTextSplitter or RecursiveCharacterTextSplitter.
+
+    Wraps a configured splitter and reproduces its split_text output without loading the file:
+    blocks are read incrementally, splits are found on the fly and merged incrementally. Only
+    one block, the current split and the chunk being built are held in memory. For the
+    recursive splitter, the top-level separator is the first one that occurs anywhere in the
+    file, found by a short pre-scan; oversized splits are re-split in memory, as before.
+    Separators must be literal strings.
+    """
+
+    def __init__(self, splitter, encoding=None, block_size=BLOCK_SIZE):
+        if not isinstance(splitter, (CharacterTextSplitter, RecursiveCharacterTextSplitter)):
+            raise TypeError("Only CharacterTextSplitter and RecursiveCharacterTextSplitter can be streamed")
+        if splitter._is_separator_regex:
+            raise ValueError("Streaming needs literal separators; a regex match can span any distance")
+        self.splitter = splitter
+        self.keep_separator = splitter._keep_separator
+        self.encoding = encoding
+        self.block_size = block_size
+
+    def _merge_separator(self, separator):
+        return "" if self.keep_separator else separator
+
+    def _choose_separator(self, separators, contains):
+        """Same choice as RecursiveCharacterTextSplitter._split_text."""
+        for i, separator in enumerate(separators):
+            if separator == "":
+                return separator, []
+            if contains(separator):
+                return separator, separators[i + 1:]
+        return separators[-1], []
+
+    def _merge_runs(self, splits, separator, new_separators):
+        """The good-split / oversized-split loop of RecursiveCharacterTextSplitter._split_text."""
+        merger = SplitMerger(self.splitter, self._merge_separator(separator))
+        for split in splits:
+            if self.splitter._length_function(split[0]) < self.splitter._chunk_size:
+                yield from merger.add(split)
+                continue
+            yield from merger.finish()
+            if not new_separators:
+                yield split
+            else:
+                yield from self._split_in_memory(split[0], split[1], new_separators)
+        yield from merger.finish()
+
+    def _split_in_memory(self, text, base, separators):
+        separator, new_separators = self._choose_separator(separators, lambda s: s in text)
+        splits = find_splits(text, base, re.escape(separator), self.keep_separator)
+        yield from self._merge_runs(splits, separator, new_separators)
+
+    def iter_chunks(self, path):
+        """Yield (text, start, end) for every chunk of the file, in order."""
+        blocks = read_blocks(path, self.encoding, self.block_size)
+        if isinstance(self.splitter, RecursiveCharacterTextSplitter):
+            separator, new_separators = self._choose_separator(
+                self.splitter._separators, lambda s: file_contains(path, s, self.encoding, self.block_size))
+            yield from self._merge_runs(stream_splits(blocks, separator, self.keep_separator),
+                                        separator, new_separators)
+        else:
+            separator = self.splitter._separator
+            merger = SplitMerger(self.splitter, self._merge_separator(separator))
+            for split in stream_splits(blocks, separator, self.keep_separator):
+                yield from merger.add(split)
+            yield from merger.finish()
+
+    def lazy_split_file(self, path, metadata=None):
+        """Yield Documents with start_index/end_index metadata, like split_documents but lazily."""
+        for text, start, end in self.iter_chunks(path):
+            yield Document(page_content=text, metadata={**(metadata or {}), "start_index": start, "end_index": end})
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, seconds
+
+
+splitters = {
+    "CharacterTextSplitter": CharacterTextSplitter(chunk_size=1000, chunk_overlap=100),
+    "RecursiveCharacterTextSplitter": RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100),
+}
+
+print("\n--- Chunks match the original splitters ---")
+for book in (ODYSSEY_BOOK_STR, ROMEO_AND_JULIET_BOOK_STR):
+    file_path = os.path.join(books_dir, book)
+    text = TextLoader(file_path).load()[0].page_content
+    for name, splitter in splitters.items():
+        expected = splitter.split_text(text)
+        # A small block size exercises separators that straddle block boundaries
+        streamed = list(StreamingTextSplitter(splitter, block_size=4096).iter_chunks(file_path))
+        assert [chunk for chunk, _, _ in streamed] == expected
+        exact = sum(text[start:end] == chunk for chunk, start, end in streamed)
+        print("{:<22} {:<32} {:>5} chunks identical, {:>5} at exact offsets".format(book, name, len(expected), exact))
+
+print("\n--- Peak memory while splitting ---")
+odyssey_text = TextLoader(os.path.join(books_dir, ODYSSEY_BOOK_STR)).load()[0].page_content
+splitter = splitters["RecursiveCharacterTextSplitter"]
+temporary_dir = tempfile.mkdtemp()
+try:
+    for copies in CORPUS_COPIES:
+        corpus_path = os.path.join(temporary_dir, "corpus_{}.txt".format(copies))
+        with open(corpus_path, "w", encoding="utf-8") as f:
+            for _ in range(copies):
+                f.write(odyssey_text)
+        size_mb = os.path.getsize(corpus_path) / 1e6
+
+        count, streaming_peak, streaming_seconds = peak_memory(
+            lambda: sum(1 for _ in StreamingTextSplitter(splitter).lazy_split_file(corpus_path)))
+        _, loaded_peak, loaded_seconds = peak_memory(
+            lambda: len(splitter.split_documents(TextLoader(corpus_path).load())))
+        print("{:>6.1f} MB, {:>6} chunks | streaming peak {:>7.1f} MB in {:.2f}s | load + split_documents "
+              "peak {:>7.1f} MB in {:.2f}s".format(size_mb, count, streaming_peak / 1e6, streaming_seconds,
+                                                    loaded_peak / 1e6, loaded_seconds))
+finally:
+    shutil.rmtree(temporary_dir)
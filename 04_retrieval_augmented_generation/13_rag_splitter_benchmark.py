@@ -0,0 +1,309 @@
+import os
+import re
+import time
+import tracemalloc
+
+from langchain.text_splitter import (
+    CharacterTextSplitter,
+    RecursiveCharacterTextSplitter,
+    SentenceTransformersTokenTextSplitter,
+    TextSplitter,
+    TokenTextSplitter,
+)
+from langchain_community.document_loaders import TextLoader
+
+# Constants
+BOOKS_DIR_STR = "books"
+ODYSSEY_BOOK_STR = "odyssey.txt"
+ROMEO_AND_JULIET_BOOK_STR = "romeo_and_juliet.txt"
+BENCHMARK_REPEATS = 5  # Best of N runs is reported
+COMPACT_AFTER = 1024  # Merged spans dropped from the merge window before the list is compacted
+NON_SPACE = re.compile(r"\S")  # Same whitespace definition as str.strip()
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+books_dir = os.path.join(current_dir, BOOKS_DIR_STR)
+
+
+def separator_spans(text, start, end, separator, keep_separator):
+    """(start, end, characters) of the splits of text[start:end] on a literal separator.
+
+    Mirrors _split_text_with_regex: empty splits are dropped, and with keep_separator the
+    separator stays attached to the start (True or "start") or the end ("end") of a split.
+    """
+    if not separator:
+        return [(i, i + 1, 1) for i in range(start, end)]
+    spans = []
+    append, find, width = spans.append, text.find, len(separator)
+    split_start = start
+    index = find(separator, start, end)
+    if not keep_separator:
+        while index != -1:
+            if index > split_start:
+                append((split_start, index, index - split_start))
+            split_start = index + width
+            index = find(separator, split_start, end)
+    else:
+        shift = width if keep_separator == "end" else 0
+        while index != -1:
+            split_end = index + shift
+            if split_end > split_start:
+                append((split_start, split_end, split_end - split_start))
+                split_start = split_end
+            index = find(separator, index + width, end)
+    if end > split_start:
+        append((split_start, end, end - split_start))
+    return spans
+
+
+def token_windows(count, tokens_per_chunk, chunk_overlap):
+    """The (start, end) token windows of split_text_on_tokens."""
+    windows = []
+    start, end = 0, min(tokens_per_chunk, count)
+    while start < count:
+        windows.append((start, end))
+        if end == count:
+            break
+        start += tokens_per_chunk - chunk_overlap
+        end = min(start + tokens_per_chunk, count)
+    return windows
+
+
+class SpanMergeMixin:
+    """TextSplitter._merge_splits over (start, end) spans of one source text.
+
+    Splits are never copied out of the text: lengths come from the offsets (or from the
+    length function, for non-default ones), and a chunk is cut from the source with a single
+    slice after stripping is done on offsets. Only when the splitter dropped empty splits
+    between repeated separators inside a chunk is it joined from its parts, as before.
+    Chunks are (text, start, end) with start/end the offsets of the stripped chunk.
+    """
+
+    def _measured(self, text, spans):
+        """Replace character counts with the length function's, when it is not len."""
+        if self._length_function is len:
+            return spans
+        return [(start, end, self._length_function(text[start:end])) for start, end, _ in spans]
+
+    def _merge_spans(self, text, spans, separator, chunks):
+        chunk_size, chunk_overlap = self._chunk_size, self._chunk_overlap
+        separator_len = self._length_function(separator)
+        window, head, total = [], 0, 0  # window[head:] holds the spans of the chunk being built
+        for span in spans:
+            length = span[2]
+            count = len(window) - head
+            if count and total + length + separator_len > chunk_size:
+                self._append_chunk(text, window, head, separator, total, chunks)
+                while total > chunk_overlap or (
+                        total + length + (separator_len if count else 0) > chunk_size and total > 0):
+                    total -= window[head][2] + (separator_len if count > 1 else 0)
+                    head += 1
+                    count -= 1
+                if head > COMPACT_AFTER:
+                    del window[:head]
+                    head = 0
+            window.append(span)
+            total += length + (separator_len if count else 0)
+        if len(window) > head:
+            self._append_chunk(text, window, head, separator, total, chunks)
+
+    def _append_chunk(self, text, window, head, separator, total, chunks):
+        start, end = window[head][0], window[-1][1]
+        if separator:
+            # total counts characters when the length function is len
+            characters = total if self._length_function is len else (
+                sum(part_end - part_start for part_start, part_end, _ in window[head:])
+                + len(separator) * (len(window) - head - 1))
+            if end - start != characters:
+                self._append_joined_chunk(text, window[head:], separator, chunks)
+                return
+        if self._strip_whitespace:
+            match = NON_SPACE.search(text, start, end)
+            if match is None:
+                return
+            start = match.start()
+            while text[end - 1].isspace():
+                end -= 1
+        chunks.append((text[start:end], start, end))
+
+    def _append_joined_chunk(self, text, parts, separator, chunks):
+        joined = separator.join(text[part_start:part_end] for part_start, part_end, _ in parts)
+        lead = trail = 0
+        if self._strip_whitespace:
+            lead = len(joined) - len(joined.lstrip())
+            trail = len(joined) - len(joined.rstrip())
+        chunk = joined[lead:len(joined) - trail]
+        if chunk == "":
+            return
+        chunks.append((chunk, self._source_offset(parts, separator, lead),
+                       self._source_offset(parts, separator, len(joined) - trail - 1) + 1))
+
+    @staticmethod
+    def _source_offset(parts, separator, position):
+        cursor = 0
+        for index, (start, end, _) in enumerate(parts):
+            if position < cursor + end - start:
+                return start + position - cursor
+            cursor += end - start
+            if index < len(parts) - 1:
+                if position < cursor + len(separator):
+                    return end + position - cursor
+                cursor += len(separator)
+        return parts[-1][1]
+
+    def split_text(self, text):
+        return [chunk for chunk, _, _ in self.split_spans(text)]
+
+
+class OffsetCharacterTextSplitter(SpanMergeMixin, CharacterTextSplitter):
+    def split_spans(self, text):
+        if self._is_separator_regex:
+            raise ValueError("Offset splitting supports literal separators only")
+        spans = self._measured(text, separator_spans(text, 0, len(text), self._separator, self._keep_separator))
+        chunks = []
+        self._merge_spans(text, spans, "" if self._keep_separator else self._separator, chunks)
+        return chunks
+
+
+class OffsetRecursiveCharacterTextSplitter(SpanMergeMixin, RecursiveCharacterTextSplitter):
+    def _split_spans(self, text, start, end, separators, chunks):
+        separator, new_separators = separators[-1], []
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator, new_separators = candidate, separators[i + 1:]
+                break
+
+        merge_separator = "" if self._keep_separator else separator
+        good_spans = []
+        for span in self._measured(text, separator_spans(text, start, end, separator, self._keep_separator)):
+            if span[2] < self._chunk_size:
+                good_spans.append(span)
+                continue
+            if good_spans:
+                self._merge_spans(text, good_spans, merge_separator, chunks)
+                good_spans = []
+            if not new_separators:
+                chunks.append((text[span[0]:span[1]], span[0], span[1]))
+            else:
+                self._split_spans(text, span[0], span[1], new_separators, chunks)
+        if good_spans:
+            self._merge_spans(text, good_spans, merge_separator, chunks)
+
+    def split_spans(self, text):
+        if self._is_separator_regex:
+            raise ValueError("Offset splitting supports literal separators only")
+        chunks = []
+        self._split_spans(text, 0, len(text), self._separators, chunks)
+        return chunks
+
+
+class OffsetTokenTextSplitter(TokenTextSplitter):
+    """TokenTextSplitter that slices the UTF-8 source at token boundaries instead of decoding windows.
+
+    tiktoken tokens are byte sequences that concatenate to the UTF-8 text, and decode() is
+    bytes.decode("utf-8", errors="replace") of that concatenation, so a chunk is the byte slice
+    between its first and last token. Each token's bytes are looked up once, even where
+    windows overlap. Spans are byte offsets into text.encode("utf-8").
+    """
+
+    def split_spans(self, text):
+        ids = self._tokenizer.encode(text, allowed_special=self._allowed_special,
+                                     disallowed_special=self._disallowed_special)
+        windows = token_windows(len(ids), self._chunk_size, self._chunk_overlap)
+        offsets, position, previous = {0: 0}, 0, 0
+        for boundary in sorted({index for window in windows for index in window}):
+            position += len(self._tokenizer.decode_bytes(ids[previous:boundary]))
+            offsets[boundary] = position
+            previous = boundary
+        return [(offsets[start], offsets[end]) for start, end in windows]
+
+    def split_text(self, text):
+        try:
+            data = text.encode("utf-8")
+        except UnicodeEncodeError:  # Lone surrogates, which tiktoken replaces before encoding
+            return super().split_text(text)
+        return [data[start:end].decode("utf-8", errors="replace") for start, end in self.split_spans(text)]
+
+
+class OffsetSentenceTransformersTokenTextSplitter(SentenceTransformersTokenTextSplitter):
+    """Encodes once and decodes each window once, sharing the window loop of the token splitter.
+
+    There are no spans: the WordPiece tokenizer lowercases and re-spaces text when decoding,
+    so its chunks are not substrings of the source and cannot be cut from it by offsets.
+    """
+
+    def split_text(self, text):
+        ids = self._encode(text)[1:-1]
+        return [self.tokenizer.decode(ids[start:end])
+                for start, end in token_windows(len(ids), self.tokens_per_chunk, self._chunk_overlap)]
+
+
+class CustomTextSplitter(TextSplitter):
+    def split_text(self, text):
+        return text.split("\n\n")  # Splitting by paragraphs, as in 03_rag_text_splitting.py
+
+
+class OffsetCustomTextSplitter(CustomTextSplitter):
+    """str.split is already one pass in C, so split_text is kept; split_spans adds the offsets."""
+
+    def split_spans(self, text):
+        spans, start = [], 0
+        index = text.find("\n\n")
+        while index != -1:
+            spans.append((start, index))
+            start = index + 2
+            index = text.find("\n\n", start)
+        spans.append((start, len(text)))
+        return spans
+
+
+def build_strategies():
+    """(original, offset-based) splitter pairs, configured as in 03_rag_text_splitting.py."""
+    strategies = {
+        "character": (CharacterTextSplitter(chunk_size=1000, chunk_overlap=100),
+                      OffsetCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)),
+    }
+    try:
+        strategies["sentence_transformers"] = (SentenceTransformersTokenTextSplitter(chunk_size=1000),
+                                               OffsetSentenceTransformersTokenTextSplitter(chunk_size=1000))
+    except ImportError as e:
+        print("Skipping sentence_transformers: {}".format(e))
+    strategies["token"] = (TokenTextSplitter(chunk_overlap=0, chunk_size=512),
+                           OffsetTokenTextSplitter(chunk_overlap=0, chunk_size=512))
+    strategies["recursive_character"] = (RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100),
+                                         OffsetRecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100))
+    strategies["custom"] = (CustomTextSplitter(), OffsetCustomTextSplitter())
+    return strategies
+
+
+def measure(split, text):
+    """Best-of-N throughput in MB/s and the peak memory allocated while splitting once."""
+    seconds = []
+    for _ in range(BENCHMARK_REPEATS):
+        start = time.perf_counter()
+        split(text)
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    split(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(text.encode("utf-8")) / 1e6 / min(seconds), peak
+
+
+strategies = build_strategies()
+
+for book in (ODYSSEY_BOOK_STR, ROMEO_AND_JULIET_BOOK_STR):
+    text = TextLoader(os.path.join(books_dir, book)).load()[0].page_content
+    print("\n--- {} ({:.2f} MB) ---".format(book, len(text.encode("utf-8")) / 1e6))
+    print("{:<22} {:>7} | {:>9} {:>11} | {:>9} {:>11}".format(
+        "strategy", "chunks", "orig MB/s", "orig alloc", "span MB/s", "span alloc"))
+    for name, (original, offset_based) in strategies.items():
+        expected = original.split_text(text)
+        if offset_based.split_text(text) != expected:
+            raise AssertionError("{} chunks differ from the original splitter".format(name))
+        original_rate, original_peak = measure(original.split_text, text)
+        offset_rate, offset_peak = measure(offset_based.split_text, text)
+        print("{:<22} {:>7} | {:>9.1f} {:>8.2f} MB | {:>9.1f} {:>8.2f} MB".format(
+            name, len(expected), original_rate, original_peak / 1e6, offset_rate, offset_peak / 1e6))
@@ -0,0 +1,199 @@
+import csv
+import os
+import re
+import shutil
+import tempfile
+import time
+import zlib
+
+import numpy as np
+from langchain.text_splitter import (
+    CharacterTextSplitter,
+    RecursiveCharacterTextSplitter,
+    SentenceTransformersTokenTextSplitter,
+    TextSplitter,
+    TokenTextSplitter,
+)
+from langchain_community.document_loaders import TextLoader
+from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import Embeddings
+
+# Constants
+BOOKS_DIR_STR = "books"
+ROMEO_AND_JULIET_BOOK_STR = "romeo_and_juliet.txt"
+REPORTS_DIR_STR = "reports"
+CSV_REPORT_STR = "chunking_evaluation.csv"
+SENTENCE_TRANSFORMER_MODELS = [
+    "sentence-transformers/all-MiniLM-L6-v2",
+    "sentence-transformers/all-mpnet-base-v2",  # HUGGINGFACE_MODEL_STR in 04_rag_embedding.py
+]
+K_VALUES = [1, 3, 5]
+QUERY_REPEATS = 5  # Timed searches per question, for the latency percentiles
+
+# Golden set: each question with a verbatim passage of the book that answers it. A retrieved
+# chunk is relevant when it contains the whole passage, compared word by word, so the
+# lowercased output of the sentence-transformers splitter is judged like the others
+GOLDEN_QUESTIONS = [
+    ("How did Juliet die?", "O happy dagger"),
+    ("How did Romeo die?", "Thy drugs are quick. Thus with a kiss I die."),
+    ("What does Juliet say about names and roses?", "What’s in a name? That which we call a rose"),
+    ("What does Mercutio curse as he dies?", "A plague o’ both your houses"),
+    ("What does Mercutio say about Queen Mab?", "I see Queen Mab hath been with you"),
+    ("How does Romeo describe Juliet at her window?", "It is the east, and Juliet is the sun!"),
+    ("How long will the friar's potion make Juliet seem dead?", "two and forty hours"),
+    ("Who killed Tybalt?", "Romeo slew Tybalt, Romeo must not live."),
+    ("What happened to Romeo after Tybalt's death?", "Tybalt is dead, and Romeo banished."),
+    ("What does the prologue say about the two families?", "From ancient grudge break to new mutiny"),
+    ("How are the lovers described in the prologue?", "A pair of star-cross’d lovers take their life"),
+    ("Which bird do Romeo and Juliet argue about at dawn?", "It was the nightingale, and not the lark"),
+    ("What does Juliet say when she learns Romeo is a Montague?", "My only love sprung from my only hate!"),
+    ("Why could Friar John not deliver the letter to Romeo?", "Where the infectious pestilence did reign"),
+    ("Where is Juliet to marry Paris?", "The County Paris, at Saint Peter’s Church"),
+    ("What do Romeo and Juliet say about pilgrims when they first meet?", "palm to palm is holy palmers’ kiss"),
+]
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+file_path = os.path.join(current_dir, BOOKS_DIR_STR, ROMEO_AND_JULIET_BOOK_STR)
+reports_dir = os.path.join(current_dir, REPORTS_DIR_STR)
+
+
+class CustomTextSplitter(TextSplitter):
+    def split_text(self, text):
+        return text.split("\n\n")  # Splitting by paragraphs, as in 03_rag_text_splitting.py
+
+
+class WordOverlapEmbeddings(Embeddings):
+    """Unit-length hashed word counts, the evaluation's fallback for the sentence-transformers models.
+
+    Retrieval then ranks chunks by the words they share with the question, a lexical baseline
+    for the recall and MRR columns. Vectors are normalised for the same reason as in
+    load_embedding_models: Chroma's L2 ranking becomes the cosine ranking.
+    """
+
+    def __init__(self, size=512):
+        self.size = size
+
+    def embed_documents(self, texts):
+        vectors = np.zeros((len(texts), self.size), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"[a-z']+", text.lower()):
+                vectors[row, zlib.crc32(word.encode()) % self.size] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.where(norms == 0, 1, norms)).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def build_splitters():
+    """The chunking strategies of 03_rag_text_splitting.py, with the same settings."""
+    splitters = {"character": CharacterTextSplitter(chunk_size=1000, chunk_overlap=100)}
+    try:
+        splitters["sentence_transformers"] = SentenceTransformersTokenTextSplitter(chunk_size=1000)
+    except ImportError:
+        print("sentence-transformers is not installed; skipping the sentence-based splitter.")
+    splitters["token"] = TokenTextSplitter(chunk_overlap=0, chunk_size=512)
+    splitters["recursive_character"] = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    splitters["custom"] = CustomTextSplitter()
+    return splitters
+
+
+def load_embedding_models():
+    try:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        # Normalised vectors make Chroma's default L2 ranking the cosine ranking
+        return {name: HuggingFaceEmbeddings(model_name=name, encode_kwargs={"normalize_embeddings": True})
+                for name in SENTENCE_TRANSFORMER_MODELS}
+    except ImportError:
+        print("sentence-transformers is not installed; evaluating with word-overlap embeddings instead.")
+        return {"word overlap (fallback)": WordOverlapEmbeddings()}
+
+
+def words(text):
+    return " {} ".format(" ".join(re.findall(r"[a-z0-9]+", text.lower())))
+
+
+def first_relevant_rank(results, evidence):
+    """1-based rank of the first retrieved chunk containing the evidence, or None."""
+    evidence_words = words(evidence)
+    for rank, document in enumerate(results, 1):
+        if evidence_words in words(document.page_content):
+            return rank
+    return None
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def evaluate(splitter, embeddings, documents):
+    """Index the documents in a fresh Chroma store and run the golden set against it."""
+    store_dir = tempfile.mkdtemp(prefix="chunking_evaluation_")
+    try:
+        start = time.perf_counter()
+        chunks = splitter.split_documents(documents)
+        db = Chroma.from_documents(documents=chunks, embedding=embeddings, persist_directory=store_dir)
+        ingestion_seconds = time.perf_counter() - start
+        index_bytes = directory_size(store_dir)
+
+        max_k = max(K_VALUES)
+        db.similarity_search(GOLDEN_QUESTIONS[0][0], k=max_k)  # Warm-up, so model loading is not timed
+        ranks, latencies = [], []
+        for question, evidence in GOLDEN_QUESTIONS:
+            for _ in range(QUERY_REPEATS):
+                start = time.perf_counter()
+                results = db.similarity_search(question, k=max_k)
+                latencies.append(time.perf_counter() - start)
+            ranks.append(first_relevant_rank(results, evidence))
+        db.delete_collection()
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    row = {"chunks": len(chunks)}
+    for k in K_VALUES:
+        row["recall@{}".format(k)] = sum(rank is not None and rank <= k for rank in ranks) / len(ranks)
+    row["mrr"] = sum(1 / rank for rank in ranks if rank is not None) / len(ranks)
+    row["index_mb"] = index_bytes / 1e6
+    row["ingestion_s"] = ingestion_seconds
+    for percentile in (50, 95, 99):
+        row["p{}_ms".format(percentile)] = float(np.percentile(latencies, percentile)) * 1000
+    return row
+
+
+def print_row(row):
+    print("{strategy:<22} {embedding_model:<42} {chunks:>6} {recall@1:>5.2f} {recall@3:>5.2f} {recall@5:>5.2f} "
+          "{mrr:>5.2f} {index_mb:>8.2f} {ingestion_s:>8.2f} {p50_ms:>7.1f} {p95_ms:>7.1f} {p99_ms:>7.1f}".format(**row))
+
+
+if not os.path.exists(file_path):
+    raise FileNotFoundError("The file {} does not exist. Please check the path".format(file_path))
+
+documents = TextLoader(file_path=file_path).load()
+book_words = words(documents[0].page_content)
+for question, evidence in GOLDEN_QUESTIONS:
+    if words(evidence) not in book_words:
+        raise ValueError("The evidence for {!r} does not occur in the book".format(question))
+
+splitters = build_splitters()
+embedding_models = load_embedding_models()
+
+print("\n--- Chunking evaluation: {} questions, {} strategies, {} embedding models ---".format(
+    len(GOLDEN_QUESTIONS), len(splitters), len(embedding_models)))
+print("{:<22} {:<42} {:>6} {:>5} {:>5} {:>5} {:>5} {:>8} {:>8} {:>7} {:>7} {:>7}".format(
+    "Strategy", "Embedding model", "Chunks", "R@1", "R@3", "R@5", "MRR", "Index MB", "Ingest s",
+    "p50 ms", "p95 ms", "p99 ms"))
+rows = []
+for model_name, embeddings in embedding_models.items():
+    for strategy_name, splitter in splitters.items():
+        row = {"strategy": strategy_name, "embedding_model": model_name}
+        row.update(evaluate(splitter, embeddings, documents))
+        print_row(row)
+        rows.append(row)
+
+os.makedirs(reports_dir, exist_ok=True)
+with open(os.path.join(reports_dir, CSV_REPORT_STR), "w", encoding="utf-8", newline="") as f:
+    writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+print("\nReport written to {}".format(os.path.join(reports_dir, CSV_REPORT_STR)))
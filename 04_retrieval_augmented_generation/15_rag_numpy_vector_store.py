@@ -0,0 +1,307 @@
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from langchain_openai import OpenAIEmbeddings
+
+load_dotenv()
+
+# Constants
+DB_STR = "db"
+CHROMA_DB_WITH_METADATA_STR = "chroma_db_with_metadata"
+NUMPY_DB_WITH_METADATA_STR = "numpy_db_with_metadata"
+TEXT_EMBEDDING_3_SMALL = "text-embedding-3-small"
+VECTORS_FILE_STR = "vectors.f32"
+DOCUMENTS_FILE_STR = "documents.jsonl"
+INDEX_FILE_STR = "index.json"
+QUERY_BATCH_SIZE = 256  # Queries scored per matrix product, bounding the (queries x rows) score matrix
+CHROMA_EXPORT_BATCH_SIZE = 1000
+BENCHMARK_QUERIES = 200
+BENCHMARK_K = 3
+BENCHMARK_NOISE = 0.05  # Perturbation of stored vectors used as benchmark queries
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+db_dir = os.path.join(current_dir, DB_STR)
+chroma_dir = os.path.join(db_dir, CHROMA_DB_WITH_METADATA_STR)
+numpy_dir = os.path.join(db_dir, NUMPY_DB_WITH_METADATA_STR)
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def mmr_select(query_similarity, vectors, k, lambda_mult):
+    """Vectorised maximal_marginal_relevance over unit vectors; returns positions in `vectors`.
+
+    Picks the same documents as the loop Chroma uses: each step adds the candidate with the
+    best lambda * query similarity - (1 - lambda) * max similarity to those already picked.
+    """
+    k = min(k, len(vectors))
+    if k <= 0:
+        return []
+    selected = [int(np.argmax(query_similarity))]
+    available = np.ones(len(vectors), dtype=bool)
+    available[selected[0]] = False
+    redundancy = vectors @ vectors[selected[0]]
+    while len(selected) < k:
+        scores = lambda_mult * query_similarity - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, vectors @ vectors[best])
+    return selected
+
+
+class NumpyFlatVectorStore(VectorStore):
+    """Exact vector search over a memory-mapped float32 matrix, usable wherever Chroma is.
+
+    L2-normalised embeddings are appended to one contiguous file that is memory-mapped for
+    search, so every query is a single matrix product and the OS page cache keeps the matrix
+    resident. Texts, metadata and ids live in a JSON-lines file loaded at start-up. index.json
+    records the committed row count; it is replaced last on every add, so rows left behind by
+    an interrupted add are ignored and cut off by the next one.
+
+    Scores follow Chroma's default space: similarity_search_with_score returns the squared L2
+    distance (2 - 2 * cosine for unit vectors), and relevance is 1 - distance / sqrt(2), so
+    score thresholds mean the same for both stores. Metadata filters are not supported.
+    """
+
+    def __init__(self, persist_directory, embedding_function):
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function
+        self._vectors_path = os.path.join(persist_directory, VECTORS_FILE_STR)
+        self._documents_path = os.path.join(persist_directory, DOCUMENTS_FILE_STR)
+        self._index_path = os.path.join(persist_directory, INDEX_FILE_STR)
+        os.makedirs(persist_directory, exist_ok=True)
+        self._load()
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def _load(self):
+        self._state = {"dimensions": None, "count": 0, "documents_bytes": 0}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+        self.ids, self.texts, self.metadatas = [], [], []
+        with open(self._documents_path, "ab+") as f:
+            f.seek(0)
+            for line in f.read(self._state["documents_bytes"]).splitlines():
+                row = json.loads(line)
+                self.ids.append(row["id"])
+                self.texts.append(row["text"])
+                self.metadatas.append(row["metadata"])
+        self._map()
+
+    def _map(self):
+        count, dimensions = self._state["count"], self._state["dimensions"]
+        if count:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, dimensions))
+        else:
+            self._matrix = np.empty((0, dimensions or 0), dtype=np.float32)
+
+    def _append(self, path, committed_bytes, data):
+        with open(path, "ab") as f:
+            f.truncate(committed_bytes)  # Drop whatever an interrupted add wrote past the committed rows
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, ids=None):
+        """Add rows with precomputed embeddings, e.g. exported from another store."""
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = normalize(embeddings).reshape(len(texts), -1)
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        if not len(texts) == len(metadatas) == len(ids):
+            raise ValueError("Got {} texts, {} metadatas and {} ids".format(len(texts), len(metadatas), len(ids)))
+        dimensions = self._state["dimensions"] or vectors.shape[1]
+        if vectors.shape[1] != dimensions:
+            raise ValueError("Expected {}-dimensional embeddings, got {}".format(dimensions, vectors.shape[1]))
+
+        lines = b"".join(json.dumps({"id": row_id, "text": text, "metadata": metadata or {}},
+                                    ensure_ascii=False).encode("utf-8") + b"\n"
+                         for row_id, text, metadata in zip(ids, texts, metadatas))
+        count = self._state["count"]
+        self._matrix = None  # Release the map before the file changes underneath it
+        self._append(self._vectors_path, count * dimensions * 4, vectors.tobytes())
+        self._append(self._documents_path, self._state["documents_bytes"], lines)
+
+        state = {"dimensions": dimensions, "count": count + len(texts),
+                 "documents_bytes": self._state["documents_bytes"] + len(lines)}
+        temporary_path = self._index_path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temporary_path, self._index_path)
+        self._state = state
+        self.ids.extend(ids)
+        self.texts.extend(texts)
+        self.metadatas.extend(metadata or {} for metadata in metadatas)
+        self._map()
+        return ids
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        return self.add_embeddings(texts, self.embedding_function.embed_documents(texts), metadatas, ids)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, persist_directory=None, **kwargs):
+        if persist_directory is None:
+            raise ValueError("NumpyFlatVectorStore needs a persist_directory to memory-map its vectors")
+        store = cls(persist_directory, embedding)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+    def __len__(self):
+        return self._state["count"]
+
+    def _document(self, index):
+        return Document(page_content=self.texts[index], metadata=dict(self.metadatas[index]))
+
+    @staticmethod
+    def _check_kwargs(kwargs):
+        if kwargs.get("filter") or kwargs.get("where_document"):
+            raise NotImplementedError("NumpyFlatVectorStore does not support metadata filters")
+
+    def _top_k(self, queries, k):
+        """(row indices, cosine similarities) of the k nearest rows for each query, best first."""
+        queries = np.atleast_2d(normalize(queries))
+        k = min(k, len(self))
+        if k <= 0:
+            return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in queries]
+        results = []
+        for start in range(0, len(queries), QUERY_BATCH_SIZE):
+            scores = queries[start:start + QUERY_BATCH_SIZE] @ self._matrix.T
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < scores.shape[1] else \
+                np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            results.extend(zip(np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)))
+        return results
+
+    def similarity_search_with_score_by_vectors(self, embeddings, k=4, **kwargs):
+        """Batched search: one list of (Document, squared L2 distance) per query embedding."""
+        self._check_kwargs(kwargs)
+        return [[(self._document(index), max(0.0, 2.0 - 2.0 * float(score))) for index, score in zip(indices, scores)]
+                for indices, scores in self._top_k(embeddings, k)]
+
+    def similarity_search_by_vectors(self, embeddings, k=4, **kwargs):
+        return [[document for document, _ in results]
+                for results in self.similarity_search_with_score_by_vectors(embeddings, k, **kwargs)]
+
+    def similarity_search_batch(self, queries, k=4, **kwargs):
+        """Search several queries with one matrix product."""
+        return self.similarity_search_by_vectors(
+            [self.embedding_function.embed_query(query) for query in queries], k, **kwargs)
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_with_score_by_vectors([self.embedding_function.embed_query(query)], k, **kwargs)[0]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return self.similarity_search_by_vectors([embedding], k, **kwargs)[0]
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [document for document, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k=4, fetch_k=20, lambda_mult=0.5, **kwargs):
+        self._check_kwargs(kwargs)
+        candidates, similarities = self._top_k([embedding], fetch_k)[0]
+        vectors = np.asarray(self._matrix[candidates])
+        return [self._document(candidates[i]) for i in mmr_select(similarities, vectors, k, lambda_mult)]
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, **kwargs):
+        return self.max_marginal_relevance_search_by_vector(
+            self.embedding_function.embed_query(query), k, fetch_k, lambda_mult, **kwargs)
+
+
+def copy_chroma_store(chroma_db, store):
+    """Copy rows and their embeddings from a Chroma store, without embedding anything again."""
+    offset = 0
+    while True:
+        page = chroma_db._collection.get(include=["embeddings", "documents", "metadatas"],
+                                         limit=CHROMA_EXPORT_BATCH_SIZE, offset=offset)
+        if not page["ids"]:
+            return offset
+        store.add_embeddings(page["documents"], page["embeddings"], page["metadatas"], page["ids"])
+        offset += len(page["ids"])
+
+
+def timed(search, query_vectors):
+    """Per-query latencies of `search(vector)` in ms and the overall queries per second."""
+    latencies = []
+    start = time.perf_counter()
+    for vector in query_vectors:
+        query_start = time.perf_counter()
+        search(vector)
+        latencies.append((time.perf_counter() - query_start) * 1000)
+    return np.array(latencies), len(query_vectors) / (time.perf_counter() - start)
+
+
+if not os.path.exists(chroma_dir):
+    raise FileNotFoundError("The vector store {} does not exist. Run 02_rag_basics_metadata.py first.".format(chroma_dir))
+
+embeddings = OpenAIEmbeddings(model=TEXT_EMBEDDING_3_SMALL)
+chroma_db = Chroma(persist_directory=chroma_dir, embedding_function=embeddings)
+numpy_db = NumpyFlatVectorStore(numpy_dir, embeddings)
+if len(numpy_db) != chroma_db._collection.count():
+    print("\n--- Copying {} into {} ---".format(CHROMA_DB_WITH_METADATA_STR, NUMPY_DB_WITH_METADATA_STR))
+    numpy_db = None  # Closes the memory map before its files are removed
+    for path in (VECTORS_FILE_STR, DOCUMENTS_FILE_STR, INDEX_FILE_STR):
+        if os.path.exists(os.path.join(numpy_dir, path)):
+            os.remove(os.path.join(numpy_dir, path))
+    numpy_db = NumpyFlatVectorStore(numpy_dir, embeddings)
+    print("Copied {} rows".format(copy_chroma_store(chroma_db, numpy_db)))
+
+# Perturbed stored vectors stand in for query embeddings, so no embedding request is timed
+rng = np.random.default_rng(0)
+rows = rng.choice(len(numpy_db), size=min(BENCHMARK_QUERIES, len(numpy_db)), replace=False)
+query_vectors = normalize(np.asarray(numpy_db._matrix[np.sort(rows)]) +
+                          rng.normal(0, BENCHMARK_NOISE, (len(rows), numpy_db._matrix.shape[1])))
+
+print("\n--- Search latency over {} rows, k={} ---".format(len(numpy_db), BENCHMARK_K))
+for name, search in (
+        ("Chroma", lambda vector: chroma_db.similarity_search_by_vector(vector.tolist(), k=BENCHMARK_K)),
+        ("NumPy flat", lambda vector: numpy_db.similarity_search_by_vector(vector, k=BENCHMARK_K))):
+    latencies, queries_per_second = timed(search, query_vectors)
+    print("{:<12} p50 {:>7.3f} ms | p95 {:>7.3f} ms | {:>8.0f} queries/s".format(
+        name, np.percentile(latencies, 50), np.percentile(latencies, 95), queries_per_second))
+
+print("\n--- Batched search of {} queries ---".format(len(query_vectors)))
+start = time.perf_counter()
+chroma_results = chroma_db._collection.query(query_embeddings=query_vectors.tolist(), n_results=BENCHMARK_K)
+chroma_seconds = time.perf_counter() - start
+start = time.perf_counter()
+numpy_db.similarity_search_by_vectors(query_vectors, k=BENCHMARK_K)
+numpy_seconds = time.perf_counter() - start
+print("Chroma       {:>8.0f} queries/s".format(len(query_vectors) / chroma_seconds))
+print("NumPy flat   {:>8.0f} queries/s".format(len(query_vectors) / numpy_seconds))
+
+# Chroma's HNSW index is approximate; the flat index is exact
+exact_ids = [{numpy_db.ids[index] for index in indices} for indices, _ in numpy_db._top_k(query_vectors, BENCHMARK_K)]
+overlap = np.mean([len(exact & set(ids)) / BENCHMARK_K for exact, ids in zip(exact_ids, chroma_results["ids"])])
+print("Chroma results matching the exact top {}: {:.1%}".format(BENCHMARK_K, overlap))
+
+# The retriever interface of 05_rag_retriever.py, unchanged
+query = "How did Juliet die?"
+for search_type, search_kwargs in (("similarity", {"k": 3}),
+                                   ("mmr", {"k": 3, "lambda_mult": 0.5}),
+                                   ("similarity_score_threshold", {"k": 3, "score_threshold": 0.1})):
+    retriever = numpy_db.as_retriever(search_type=search_type, search_kwargs=search_kwargs)
+    print("\n--- {} ---".format(search_type))
+    for i, doc in enumerate(retriever.invoke(query), 1):
+        print("Document {} ({}): {}...".format(i, doc.metadata.get("source", "Unknown"), doc.page_content[:80]))
@@ -0,0 +1,263 @@
+"""
+Start-up benchmark for every numbered script in the repository.
+
+For each script, in a fresh interpreter:
+    - import time: how long its top-level import statements take
+    - time to first call: how long the script runs before its first outbound request or
+      input() prompt, i.e. the start-up cost a user waits through before anything happens.
+      The request itself is intercepted, so no API keys or network access are needed.
+      Each run works in a throwaway copy of the chapter directories, so anything the script
+      writes (a cache file, a Chroma persist_directory) never reaches the repository.
+
+Usage:
+    python benchmarks/startup_benchmark.py                       # print the table
+    python benchmarks/startup_benchmark.py --save-baseline       # record the current numbers
+    python benchmarks/startup_benchmark.py --check               # exit 1 on regressions vs the baseline
+"""
+import argparse
+import ast
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Constants
+REPEATS = 3  # Each measurement is repeated and the fastest run is kept
+SCRIPT_TIMEOUT_SECONDS = 60
+REGRESSION_TOLERANCE = 0.25  # Relative slowdown allowed before a script is flagged
+REGRESSION_SLACK_SECONDS = 0.05  # Absolute slowdown always allowed, to absorb noise on fast scripts
+BASELINE_FILE_STR = "startup_baseline.json"
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+ENV_EXAMPLE_FILE_STR = ".env.example"
+PLACEHOLDER_API_KEY_STR = "startup-benchmark-placeholder"
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(current_dir)
+baseline_path = os.path.join(current_dir, BASELINE_FILE_STR)
+
+
+def find_numbered_scripts():
+    """All NN_*.py scripts under the NN_* chapter directories, in reading order."""
+    pattern = os.path.join(repo_dir, "[0-9][0-9]_*", "**", "[0-9][0-9]_*.py")
+    return sorted(glob.glob(pattern, recursive=True))
+
+
+def top_level_imports(script_path):
+    """Source of the import statements at the top level of a script."""
+    with open(script_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=script_path)
+    nodes = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in nodes)
+
+
+# --- Child process side ---
+
+class FirstCall(BaseException):
+    """Raised at the first outbound request or input() prompt to stop the script there."""
+
+
+def _child_import(script_path):
+    source = top_level_imports(script_path)
+    start = time.perf_counter()
+    exec(compile(source, script_path, "exec"), {"__name__": "__startup_benchmark__"})
+    return {"seconds": time.perf_counter() - start}
+
+
+def _set_placeholder_api_keys():
+    """Give every key from .env.example a placeholder so model constructors do not fail on it."""
+    env_example_path = os.path.join(repo_dir, ENV_EXAMPLE_FILE_STR)
+    if not os.path.exists(env_example_path):
+        return
+    with open(env_example_path, encoding="utf-8") as f:
+        for line in f:
+            name = line.split("=", 1)[0].strip()
+            if name and not name.startswith("#"):
+                os.environ.setdefault(name, PLACEHOLDER_API_KEY_STR)
+
+
+def _install_first_call_hooks():
+    import builtins
+    from urllib.parse import urlsplit
+
+    def stop(*args, **kwargs):
+        raise FirstCall()
+
+    builtins.input = stop
+
+    def is_loopback(url):
+        return urlsplit(str(url)).hostname in LOOPBACK_HOSTS
+
+    try:
+        import httpx
+
+        original_send = httpx.Client.send
+        original_async_send = httpx.AsyncClient.send
+
+        def send(self, request, *args, **kwargs):
+            if not is_loopback(request.url):
+                raise FirstCall()
+            return original_send(self, request, *args, **kwargs)
+
+        async def async_send(self, request, *args, **kwargs):
+            if not is_loopback(request.url):
+                raise FirstCall()
+            return await original_async_send(self, request, *args, **kwargs)
+
+        httpx.Client.send = send
+        httpx.AsyncClient.send = async_send
+    except ImportError:
+        pass
+
+    try:
+        import requests
+
+        original_session_send = requests.Session.send
+
+        def session_send(self, request, *args, **kwargs):
+            if not is_loopback(request.url):
+                raise FirstCall()
+            return original_session_send(self, request, *args, **kwargs)
+
+        requests.Session.send = session_send
+    except ImportError:
+        pass
+
+
+def _child_first_call(script_path):
+    import runpy
+
+    start = time.perf_counter()
+    _set_placeholder_api_keys()
+    _install_first_call_hooks()
+    os.chdir(os.path.dirname(script_path))
+    status = "completed"
+    try:
+        runpy.run_path(script_path, run_name="__main__")
+    except FirstCall:
+        status = "first call"
+    except ImportError as e:
+        status = "missing: {}".format(e.name or e)
+    except Exception as e:
+        status = "error: {}".format(type(e).__name__)
+    return {"seconds": time.perf_counter() - start, "status": status}
+
+
+def run_child(mode, script_path):
+    """Measure one script in a fresh interpreter and return the parsed result."""
+    command = [sys.executable, "-W", "ignore", os.path.abspath(__file__), "--child", mode, script_path]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, timeout=SCRIPT_TIMEOUT_SECONDS)
+    except subprocess.TimeoutExpired:
+        return {"seconds": None, "status": "timeout"}
+    lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        last_error_line = (completed.stderr.strip().splitlines() or ["no output"])[-1]
+        return {"seconds": None, "status": "error: {}".format(last_error_line)}
+    result = json.loads(lines[-1])
+    result.setdefault("status", "ok")
+    return result
+
+
+# --- Parent process side ---
+
+def run_first_call_in_copy(script_path):
+    """Run a script from a fresh copy of every chapter, as some scripts read other chapters' files."""
+    temporary_dir = tempfile.mkdtemp(prefix="startup_benchmark_")
+    try:
+        for chapter_dir in glob.glob(os.path.join(repo_dir, "[0-9][0-9]_*")):
+            shutil.copytree(chapter_dir, os.path.join(temporary_dir, os.path.basename(chapter_dir)),
+                            ignore=shutil.ignore_patterns("__pycache__"))
+        return run_child("first-call", os.path.join(temporary_dir, os.path.relpath(script_path, repo_dir)))
+    finally:
+        shutil.rmtree(temporary_dir, ignore_errors=True)
+
+
+def measure(script_path, repeats):
+    """Fastest import time and time to first call over `repeats` runs."""
+    imports = [run_child("import", script_path) for _ in range(repeats)]
+    first_calls = []
+    for _ in range(repeats):
+        first_calls.append(run_first_call_in_copy(script_path))
+        if first_calls[-1]["status"] == "timeout":
+            break  # A script that runs past the timeout will not finish on a second try either
+
+    def fastest(results):
+        timed = [r for r in results if r["seconds"] is not None]
+        return min(timed, key=lambda r: r["seconds"]) if timed else results[-1]
+
+    import_result, first_call_result = fastest(imports), fastest(first_calls)
+    return {
+        "import_seconds": import_result["seconds"] if import_result["status"] == "ok" else None,
+        "first_call_seconds": first_call_result["seconds"],
+        "status": first_call_result["status"] if import_result["status"] == "ok" else import_result["status"],
+    }
+
+
+def format_seconds(seconds):
+    return "-" if seconds is None else "{:.3f}s".format(seconds)
+
+
+def find_regressions(results, baseline):
+    regressions = []
+    for script, result in results.items():
+        previous = baseline.get(script)
+        if previous is None:
+            continue
+        for key in ("import_seconds", "first_call_seconds"):
+            old, new = previous.get(key), result.get(key)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + REGRESSION_TOLERANCE) + REGRESSION_SLACK_SECONDS:
+                regressions.append("{} {}: {:.3f}s -> {:.3f}s".format(script, key, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and first-call time of every numbered script.")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to the baseline file")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if a script regressed")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "SCRIPT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, script_path = args.child
+        result = _child_import(script_path) if mode == "import" else _child_first_call(script_path)
+        print(json.dumps(result))
+        return 0
+
+    results = {}
+    print("{:<70} {:>10} {:>15}  {}".format("Script", "Imports", "First call", "Status"))
+    for script_path in find_numbered_scripts():
+        script = os.path.relpath(script_path, repo_dir)
+        results[script] = measure(script_path, args.repeats)
+        print("{:<70} {:>10} {:>15}  {}".format(
+            script, format_seconds(results[script]["import_seconds"]),
+            format_seconds(results[script]["first_call_seconds"]), results[script]["status"]))
+
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print("\nBaseline saved to {}".format(baseline_path))
+
+    if args.check:
+        if not os.path.exists(baseline_path):
+            print("\nNo baseline at {}; run with --save-baseline first.".format(baseline_path))
+            return 1
+        with open(baseline_path, encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f))
+        if regressions:
+            print("\n--- Start-up regressions ---")
+            for regression in regressions:
+                print(regression)
+            return 1
+        print("\nNo start-up regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())